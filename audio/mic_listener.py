@@ -4,8 +4,10 @@ import sounddevice as sd
 from vosk import Model, KaldiRecognizer
 
 from speech.emotional_voice import speak
+from core.auto_online import start_auto_online
 from memory.conversation_logger import log_message
-from online.web_search import search_and_summarise
+from online.web_search import follow_up, search_and_summarise
+from utils.intent_router import KEYWORDS, route
 
 
 # ===== Audio config =====
@@ -13,6 +15,9 @@ SAMPLE_RATE = 44100          # works fine with your USB mic
 BLOCK_SIZE  = 4096
 DEVICE_INDEX = 0             # 0 = your USB mic (as before)
 
+# Seconds a spoken question may take before ARES says it is still looking
+VOICE_ANSWER_DEADLINE = 2.0
+
 # ===== Grammar: limited vocabulary so it understands you better =====
 GRAMMAR = json.dumps([
     "ares", "hello", "ares hello", "hello ares",
@@ -23,6 +28,8 @@ GRAMMAR = json.dumps([
     "score", "result",
     "search",
     "goodbye", "bye",
+    # follow-ups to the last web answer ("tell me more", "what else", ...)
+    *KEYWORDS["followup"],
 ])
 
 # ===== Simple intent handler (text only) =====
@@ -31,12 +38,12 @@ def handle_intent(text: str, from_voice: bool = True) -> str:
     Very small intent engine for non-web questions.
     Returns a reply string; caller decides whether to speak it.
     """
-    lower = text.lower()
+    intents = route(text)
 
-    if "how are you" in lower:
+    if "how_are_you" in intents:
         return "I feel good and ready to help you. And how are you today, Gabi?"
 
-    if "thank" in lower:
+    if "thanks" in intents:
         return "You are welcome, Gabi."
 
     # Fallback
@@ -58,6 +65,9 @@ def main():
     model = Model("models/vosk_en_small")
     rec = KaldiRecognizer(model, SAMPLE_RATE, GRAMMAR)
 
+    # refresh the questions asked every day shortly before they are usually asked
+    start_auto_online()
+
     active = False
     MIN_WORDS = 3
 
@@ -95,8 +105,10 @@ def main():
                         print(f"[Mic asleep] ignoring: {lower}")
                     continue
 
+                intents = route(lower)
+
                 # Active: check for goodbye
-                if any(w in lower for w in ("goodbye", "bye")):
+                if "goodbye" in intents:
                     reply = "Goodbye Gabi."
                     print(f"ARES: {reply}")
                     speak(reply)
@@ -104,15 +116,25 @@ def main():
                     print("[Mic] ARES is sleeping. Say 'hello ares' to wake him.")
                     continue
 
+                # "tell me more" / "what else" about the last web answer (short on purpose)
+                more = follow_up(lower, deadline=VOICE_ANSWER_DEADLINE)
+                if more:
+                    log_message("user", "voice", lower)
+                    log_message("ares", "voice", more)
+
+                    print(f"ARES: {more}")
+                    speak(more)
+                    continue
+
                 # Ignore very short noise / fragments
                 if len(lower.split()) < MIN_WORDS:
                     print("[Mic awake] too short, ignored.")
                     continue
 
                 # Decide if it's a web question
-                if any(w in lower for w in ("score", "result", "search", "weather", "stock")):
+                if "voice_web" in intents:
                     print(f"[TEXT] Processing web question: '{lower}'")
-                    answer = search_and_summarise(lower)
+                    answer = search_and_summarise(lower, deadline=VOICE_ANSWER_DEADLINE)
 
                     log_message("user", "voice", lower)
                     log_message("ares", "voice", answer)
@@ -6,12 +6,14 @@ sys.path.append(BASE_DIR)
 
 from personality.traits_manager import load_traits
 from utils.logger import log
+from online.prefetch import PREFETCH_INTERVAL_SECONDS, run_prefetch, start_prefetcher
 
 
 def check_auto_online():
     """
-    Decide if ARES 'wants' to go online to research / help Gabi.
-    Currently this only logs what he WOULD do.
+    Decide if ARES 'wants' to go online to research / help Gabi,
+    then refresh the answers to questions Gabi asks every day
+    (see online/prefetch.py) before they are asked.
     """
     traits = load_traits()
     curiosity = traits.get("curiosity", 0.5)
@@ -27,16 +29,25 @@ def check_auto_online():
     if social_need > 0.7:
         reasons.append("social need is high")
 
-    if not reasons:
+    if reasons:
+        log("[AutoOnline] ARES would like to go online because " + ", ".join(reasons))
+    else:
         log("[AutoOnline] No strong reason to go online right now.")
-        return
 
-    log("[AutoOnline] ARES would like to go online because " + ", ".join(reasons))
+    # Prefetch is budgeted (few queries, never waits for a rate-limit slot),
+    # so it runs regardless of mood.
+    refreshed = run_prefetch()
+    if refreshed:
+        log("[AutoOnline] Prefetched answers for: " + "; ".join(refreshed))
+    else:
+        log("[AutoOnline] Nothing due for prefetch.")
 
-    # PLACEHOLDER: here you can later call real APIs, e.g.
-    #   - check news
-    #   - look up health info
-    #   - search robotics articles
-    #
-    # For now we keep it safe and just log.
-    log("[AutoOnline] (Placeholder) Going to search for useful information for Gabi.")
+
+def start_auto_online():
+    """Keep prefetching in the background for the lifetime of the process."""
+    log(f"[AutoOnline] Background prefetch every {PREFETCH_INTERVAL_SECONDS // 60} minutes.")
+    return start_prefetcher()
+
+
+if __name__ == "__main__":
+    check_auto_online()
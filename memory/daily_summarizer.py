@@ -2,6 +2,8 @@ import json
 from datetime import datetime, date
 from pathlib import Path
 
+from utils.intent_router import route
+
 # ===== Paths =====
 BASE_DIR = Path(__file__).resolve().parent.parent   # /home/gabi/ARES_BRAIN
 LOG_DIR = BASE_DIR / "logs" / "conversations"
@@ -54,42 +56,34 @@ def summarize(logs):
         "important_messages": [],
     }
 
+    # keyword lists: "topic.*" / "mood.*" labels in utils/intent_router.py
     topics = ["weather", "stock", "training", "health", "rheinmetall", "work"]
-    moods = ["tired", "good", "bad", "angry", "happy", "sad", "stressed", "worried"]
 
     for entry in logs:
         text = entry.get("text", "")
         if not text:
             continue
 
-        lower = text.lower()
+        labels = route(text)
 
         # Count greetings / goodbyes
-        if "hello" in lower or "hi ares" in lower:
+        if "greeting" in labels:
             summary["greetings"] += 1
-        if "goodbye" in lower or "bye" in lower:
+        if "goodbye" in labels:
             summary["goodbyes"] += 1
 
         # Detect topics (only keep each once)
         for t in topics:
-            if t in lower and t not in summary["topics"]:
+            if f"topic.{t}" in labels and t not in summary["topics"]:
                 summary["topics"].append(t)
 
         # Mood references
-        for mood in moods:
-            if mood in lower:
-                summary["mood_references"].append(text)
-                break
+        if any(label.startswith("mood.") for label in labels):
+            summary["mood_references"].append(text)
 
         # Important user messages for long-term memory
-        if entry.get("role") == "user":
-            if (
-                "i felt" in lower
-                or "i feel" in lower
-                or "i think" in lower
-                or "important" in lower
-            ):
-                summary["important_messages"].append(text)
+        if entry.get("role") == "user" and "important" in labels:
+            summary["important_messages"].append(text)
 
     return summary
 
@@ -1,19 +1,237 @@
+import heapq
+import json
+import os
+import sqlite3
+import sys
 import time
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_DISK_CACHE_PATH = os.path.expanduser("~/.ares_net_cache.sqlite3")
+
+
+def _approx_size(obj, _depth: int = 0) -> int:
+    """Rough deep size in bytes of the JSON-like values providers cache."""
+    size = sys.getsizeof(obj)
+    if _depth > 6:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _approx_size(k, _depth + 1) + _approx_size(v, _depth + 1)
+    elif isinstance(obj, (list, tuple, set)):
+        for v in obj:
+            size += _approx_size(v, _depth + 1)
+    return size
 
 
 class TTLCache:
-    def __init__(self):
-        self._store = {}
+    """
+    Bounded LRU + TTL cache with a hard memory ceiling.
+      - max_entries: cap on the number of entries (least recently used go first)
+      - max_bytes: approximate budget for keys + values
+      - expired entries are swept on every get/set (expiry heap, O(1) when
+        nothing is due), not only when the same key happens to be read again
+      - stats(): hits, misses, evictions, expirations, size, bytes
+      - optional DiskTier behind it: survives restarts, shared between processes
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024, disk=None):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.disk = disk
+
+        # key -> (value, expires_at, size)
+        self._store = OrderedDict()
+        self._expiry = []  # heap of (expires_at, key); may hold outdated pairs
+        self._bytes = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
 
     def get(self, key: str):
-        item = self._store.get(key)
-        if not item:
-            return None
-        value, expires_at = item
-        if time.time() > expires_at:
-            self._store.pop(key, None)
-            return None
-        return value
+        with self._lock:
+            self._sweep_expired()
+            item = self._store.get(key)
+            if item and time.time() > item[1]:
+                self._remove(key)
+                self.expirations += 1
+                item = None
+            if item:
+                self._store.move_to_end(key)
+                self.hits += 1
+                return item[0]
+
+        if self.disk is not None:
+            found = self.disk.get(key)
+            if found is not None:
+                value, expires_at = found
+                self._put(key, value, expires_at)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
 
     def set(self, key: str, value, ttl_seconds: int):
-        self._store[key] = (value, time.time() + int(ttl_seconds))
+        expires_at = time.time() + int(ttl_seconds)
+        stored = self._put(key, value, expires_at)
+        if self.disk is not None:
+            if stored:
+                self.disk.set(key, value, expires_at)
+            else:
+                # neither tier may keep serving the value this one replaces
+                self.disk.delete(key)
+
+    def _put(self, key: str, value, expires_at: float) -> bool:
+        size = _approx_size(key) + _approx_size(value)
+        if size > self.max_bytes:
+            # would evict everything else; not worth caching, but drop the old value
+            with self._lock:
+                if key in self._store:
+                    self._remove(key)
+            return False
+
+        with self._lock:
+            if key in self._store:
+                self._remove(key)
+            self._store[key] = (value, expires_at, size)
+            self._bytes += size
+            heapq.heappush(self._expiry, (expires_at, key))
+
+            self._sweep_expired()
+            while self._store and (len(self._store) > self.max_entries or self._bytes > self.max_bytes):
+                old_key = next(iter(self._store))
+                self._remove(old_key)
+                self.evictions += 1
+
+            # outdated heap pairs pile up when keys are overwritten; rebuild now and then
+            if len(self._expiry) > 2 * len(self._store) + 64:
+                self._expiry = [(exp, k) for k, (_v, exp, _s) in self._store.items()]
+                heapq.heapify(self._expiry)
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._store:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self._expiry = []
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._store),
+                "bytes": self._bytes,
+                "disk_hits": self.disk_hits,
+            }
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def _remove(self, key: str):
+        _value, _expires_at, size = self._store.pop(key)
+        self._bytes -= size
+
+    def _sweep_expired(self):
+        # amortized: each expired entry is popped from the heap exactly once
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            item = self._store.get(key)
+            if item and item[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+
+class DiskTier:
+    """
+    SQLite (WAL) second tier for TTLCache: entries keep their absolute expiry,
+    so a restarted process or a cron script starts warm. Values must be
+    JSON-serializable; anything else simply stays memory-only.
+    The file is opened lazily on first access.
+    """
+
+    def __init__(self, path: str = DEFAULT_DISK_CACHE_PATH, max_entries: int = 20000):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self._conn = None
+        self._lock = Lock()
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries(expires)")
+            conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        """(value, expires_at) for a live entry, else None."""
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT value, expires FROM entries WHERE key = ? AND expires > ?", (key, time.time())
+                ).fetchone()
+            if not row:
+                return None
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def set(self, key: str, value, expires_at: float):
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            self.delete(key)  # memory-only now; an older stored value must not come back
+            return
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                    (key, payload, expires_at),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._trim(db)
+        except sqlite3.Error:
+            pass
+
+    def delete(self, key: str):
+        try:
+            with self._lock:
+                self._db().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error:
+            pass
+
+    def _trim(self, db: sqlite3.Connection):
+        db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
@@ -1,19 +1,27 @@
 import time
 import random
+import urllib.parse
 import requests
 from threading import Lock
 
+from network.cache import TTLCache
+
 
 class RateLimitedHttpClient:
     """
     Central choke-point for ALL external HTTP.
     Features:
-      - global minimum delay between calls (anti-flood)
+      - minimum delay between calls to the same service/host (anti-flood)
       - optional per-service delay (anti-ban)
-      - retries with exponential backoff for 429/5xx
-      - respects Retry-After header
-      - JSON helper
-      - thread-safe
+      - retries with exponential backoff for 429/5xx/408 and network errors;
+        other 4xx fail at once (asking again will not change the answer)
+      - respects Retry-After header (pushes back that service for everyone)
+      - JSON helper with conditional revalidation: validators (ETag /
+        Last-Modified) are kept with the parsed body, refreshes send
+        If-None-Match / If-Modified-Since, and a 304 reuses the stored
+        JSON without downloading or parsing it again
+      - thread-safe: the lock only guards slot reservation, never I/O or sleeps,
+        so a slow or rate-limited host does not stall calls to other hosts
     """
 
     def __init__(
@@ -22,68 +30,128 @@ class RateLimitedHttpClient:
         timeout: int = 10,
         max_retries: int = 3,
         user_agent: str = "ARES/1.0 (contact: you@example.com)",
+        revalidate: bool = True,
+        validator_ttl: int = 7 * 24 * 3600,
     ):
         self.min_delay = float(min_delay)
         self.timeout = int(timeout)
         self.max_retries = int(max_retries)
 
-        self._last_request = 0.0
+        # request key -> {"etag", "last_modified", "data"} for conditional GETs
+        self.revalidate = bool(revalidate)
+        self.validator_ttl = int(validator_ttl)
+        self._validators = TTLCache(max_entries=512, max_bytes=4 * 1024 * 1024)
+        self.not_modified = 0
+
+        # service (host) -> earliest time the next request may be sent
+        self._next_slot = {}
         self._lock = Lock()
 
         self._session = requests.Session()
         self._session.headers.update({"User-Agent": user_agent})
 
-    def _sleep_if_needed(self, extra_delay: float = 0.0):
-        now = time.time()
-        elapsed = now - self._last_request
-        needed = self.min_delay + max(0.0, extra_delay)
+    @staticmethod
+    def _service_of(url: str) -> str:
+        return urllib.parse.urlsplit(url).netloc.lower()
 
-        if elapsed < needed:
-            time.sleep(needed - elapsed)
+    def _reserve_slot(self, service: str, extra_delay: float = 0.0) -> float:
+        """Claim the next send slot for service; returns how long to wait for it."""
+        spacing = self.min_delay + max(0.0, extra_delay)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(service, 0.0))
+            self._next_slot[service] = slot + spacing
+        return slot - now
 
-    def get(self, url: str, params=None, headers=None, service_delay: float = 0.0):
+    def _defer(self, service: str, seconds: float):
+        """Push back every caller of service (e.g. after 429 Retry-After)."""
         with self._lock:
-            self._sleep_if_needed(extra_delay=service_delay)
-
-            last_err = None
-            for attempt in range(self.max_retries + 1):
-                try:
-                    resp = self._session.get(
-                        url,
-                        params=params,
-                        headers=headers,
-                        timeout=self.timeout,
-                    )
-
-                    self._last_request = time.time()
-
-                    # Handle rate limit
-                    if resp.status_code == 429:
-                        retry_after = resp.headers.get("Retry-After")
-                        wait = float(retry_after) if retry_after and retry_after.isdigit() else (2.0 * (attempt + 1))
-                        time.sleep(wait)
-                        continue
-
-                    # Retry transient server errors
-                    if 500 <= resp.status_code <= 599:
-                        backoff = (2 ** attempt) + random.uniform(0.0, 0.5)
-                        time.sleep(backoff)
-                        continue
-
-                    resp.raise_for_status()
-                    return resp
-
-                except requests.RequestException as e:
-                    self._last_request = time.time()
-                    last_err = e
+            until = time.monotonic() + seconds
+            if self._next_slot.get(service, 0.0) < until:
+                self._next_slot[service] = until
+
+    def _sleep_if_needed(self, service: str, extra_delay: float = 0.0):
+        wait = self._reserve_slot(service, extra_delay)
+        if wait > 0:
+            time.sleep(wait)
+
+    def get(self, url: str, params=None, headers=None, service_delay: float = 0.0):
+        service = self._service_of(url)
+
+        last_err = None
+        for attempt in range(self.max_retries + 1):
+            self._sleep_if_needed(service, extra_delay=service_delay)
+            try:
+                resp = self._session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+
+                # Handle rate limit
+                if resp.status_code == 429:
+                    retry_after = resp.headers.get("Retry-After")
+                    wait = float(retry_after) if retry_after and retry_after.isdigit() else (2.0 * (attempt + 1))
+                    self._defer(service, wait)
+                    last_err = requests.HTTPError(f"429 Too Many Requests for {url}")
+                    continue
+
+                # Retry transient server errors
+                if 500 <= resp.status_code <= 599 or resp.status_code == 408:
                     backoff = (2 ** attempt) + random.uniform(0.0, 0.5)
+                    last_err = requests.HTTPError(f"{resp.status_code} Server Error for {url}")
                     time.sleep(backoff)
+                    continue
+
+                if resp.status_code >= 400:
+                    # outside RequestException on purpose: not retried
+                    raise RuntimeError(f"HTTP {resp.status_code} for {url}")
+                return resp
 
-            raise RuntimeError(f"HTTP failed after retries for {url}: {last_err}")
+            except requests.RequestException as e:
+                last_err = e
+                backoff = (2 ** attempt) + random.uniform(0.0, 0.5)
+                time.sleep(backoff)
+
+        raise RuntimeError(f"HTTP failed after retries for {url}: {last_err}")
+
+    @staticmethod
+    def _validator_key(url: str, params) -> str:
+        if not params:
+            return url
+        return url + "?" + urllib.parse.urlencode(sorted(dict(params).items()))
 
     def get_json(self, url: str, params=None, headers=None, service_delay: float = 0.0):
+        key = self._validator_key(url, params)
+        stored = self._validators.get(key) if self.revalidate else None
+
+        if stored:
+            headers = dict(headers or {})
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
         resp = self.get(url, params=params, headers=headers, service_delay=service_delay)
+
+        if resp.status_code == 304 and stored:
+            # unchanged upstream: no body was sent, keep the parsed copy alive
+            self.not_modified += 1
+            self._validators.set(key, stored, ttl_seconds=self.validator_ttl)
+            return stored["data"]
+
         try:
-            return resp.json()
+            data = resp.json()
         except Exception as e:
             raise RuntimeError(f"Invalid JSON from {url}: {e}")
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if self.revalidate and (etag or last_modified):
+            self._validators.set(
+                key,
+                {"etag": etag, "last_modified": last_modified, "data": data},
+                ttl_seconds=self.validator_ttl,
+            )
+        return data
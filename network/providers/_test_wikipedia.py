@@ -1,11 +1,11 @@
 from network.http_client import RateLimitedHttpClient
-from network.cache import TTLCache
+from network.cache import DiskTier, TTLCache
 from network.providers.wikipedia import WikipediaProvider
 
 
 def main():
     http = RateLimitedHttpClient(min_delay=2.0, timeout=8)
-    cache = TTLCache()
+    cache = TTLCache(disk=DiskTier())  # warm across runs
 
     wiki = WikipediaProvider(http, cache)
 
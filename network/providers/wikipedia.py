@@ -1,5 +1,5 @@
 import urllib.parse
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from network.http_client import RateLimitedHttpClient
 from network.cache import TTLCache
@@ -10,11 +10,19 @@ class WikipediaProvider:
     Wikipedia integration:
       - Summary uses Wikipedia REST API (rest_v1)
       - Search uses MediaWiki API (w/api.php) because REST v1 has no /search/title
+      - summaries() / search_with_summaries() batch intro extracts for many
+        titles (or a whole search) into one MediaWiki call and fill a
+        per-title extract cache (separate from summary()'s REST text),
+        instead of one paced request per title
     """
 
     REST_BASE = "https://en.wikipedia.org/api/rest_v1"
     MW_BASE = "https://en.wikipedia.org/w/api.php"
 
+    # prop=extracts returns at most 20 intro extracts per call
+    EXTRACTS_BATCH = 20
+    SUMMARY_TTL = 60 * 30  # 30 min
+
     def __init__(self, http: RateLimitedHttpClient, cache: TTLCache):
         self.http = http
         self.cache = cache
@@ -45,9 +53,125 @@ class WikipediaProvider:
                      .get("page"),
         }
 
-        self.cache.set(key, result, ttl_seconds=60 * 30)  # 30 min
+        self.cache.set(key, result, ttl_seconds=self.SUMMARY_TTL)
         return result
 
+    @staticmethod
+    def _page_url(title: str) -> str:
+        return f"https://en.wikipedia.org/wiki/{urllib.parse.quote(title.replace(' ', '_'))}"
+
+    def _extract_params(self, limit: int) -> Dict[str, Any]:
+        return {
+            "action": "query",
+            "prop": "extracts|info",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": limit,
+            "inprop": "url",
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+            "utf8": 1,
+        }
+
+    def _page_result(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        title = page.get("title")
+        return {
+            "title": title,
+            "extract": page.get("extract"),
+            "url": page.get("fullurl") or (self._page_url(title) if title else None),
+        }
+
+    def _cache_extract(self, title: str, result: Dict[str, Any]):
+        # exintro text from the batch API; summary() keeps the REST text under its own key
+        self.cache.set(f"wiki:extract:{title.lower()}", result, ttl_seconds=self.SUMMARY_TTL)
+
+    def summaries(self, titles: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Summaries for several titles, keyed by the title as given.
+        Cached titles cost nothing; the rest go out EXTRACTS_BATCH per request.
+        Titles that do not exist are left out.
+        """
+        wanted: List[str] = []
+        for title in titles:
+            title = (title or "").strip()
+            if title and title not in wanted:
+                wanted.append(title)
+
+        out: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for title in wanted:
+            cached = self.cache.get(f"wiki:extract:{title.lower()}")
+            if cached:
+                out[title] = cached
+            else:
+                missing.append(title)
+
+        for i in range(0, len(missing), self.EXTRACTS_BATCH):
+            chunk = missing[i:i + self.EXTRACTS_BATCH]
+            params = self._extract_params(len(chunk))
+            params["titles"] = "|".join(chunk)
+
+            data = self.http.get_json(self.MW_BASE, params=params, service_delay=self.service_delay)
+            query = data.get("query", {})
+
+            # requested title -> canonical title (case/underscore fixes, then redirects)
+            canonical = {t: t for t in chunk}
+            for step in ("normalized", "redirects"):
+                mapping = {m.get("from"): m.get("to") for m in query.get(step, [])}
+                canonical = {t: mapping.get(c, c) for t, c in canonical.items()}
+
+            pages = {}
+            for page in query.get("pages", []):
+                if page.get("missing") or page.get("invalid") or not page.get("title"):
+                    continue
+                pages[page["title"]] = self._page_result(page)
+
+            for title in chunk:
+                result = pages.get(canonical[title])
+                if result:
+                    out[title] = result
+                    self._cache_extract(title, result)
+                    if result["title"].lower() != title.lower():
+                        self._cache_extract(result["title"], result)
+
+        return out
+
+    def search_with_summaries(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Search and fetch the intro extract of each hit in one request
+        (generator=search). Each hit also lands in the per-title extract cache.
+        """
+        query = (query or "").strip()
+        if not query:
+            raise ValueError("Empty query")
+
+        k = max(1, min(int(k), self.EXTRACTS_BATCH))
+
+        key = f"wiki:searchsum:{query.lower()}:{k}"
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+
+        params = self._extract_params(k)
+        params.update({"generator": "search", "gsrsearch": query, "gsrlimit": k})
+
+        data = self.http.get_json(self.MW_BASE, params=params, service_delay=self.service_delay)
+
+        # generator results come back unordered; "index" is the search rank
+        pages = sorted(data.get("query", {}).get("pages", []), key=lambda p: p.get("index", 0))
+        items: List[Dict[str, Any]] = []
+        for page in pages:
+            if not page.get("title"):
+                continue
+            result = self._page_result(page)
+            items.append(result)
+            if result["extract"]:
+                self._cache_extract(result["title"], result)
+
+        self.cache.set(key, items, ttl_seconds=self.SUMMARY_TTL)
+        return items
+
     def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         query = (query or "").strip()
         if not query:
@@ -80,7 +204,7 @@ class WikipediaProvider:
             title = item.get("title")
             url = None
             if title:
-                url = f"https://en.wikipedia.org/wiki/{urllib.parse.quote(title.replace(' ', '_'))}"
+                url = self._page_url(title)
 
             items.append({
                 "title": title,
@@ -0,0 +1,231 @@
+import argparse
+import gzip
+import math
+import os
+import re
+import sqlite3
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_INDEX_PATH = os.path.expanduser("~/.ares_wiki_abstracts.sqlite3")
+
+# dump: https://dumps.wikimedia.org/enwiki/latest/enwiki-latest-abstract.xml.gz
+_TITLE_PREFIX = "Wikipedia: "
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# question filler; every remaining word must match, so these would only hurt recall
+_STOPWORDS = {
+    "a", "an", "and", "are", "about", "did", "do", "does", "for", "how", "in", "is",
+    "me", "of", "on", "tell", "the", "to", "was", "were", "what", "when", "where",
+    "which", "who", "whom", "why",
+}
+
+
+# OR fallback (not every word matched anywhere): a hit must still contain most of the words
+_OR_MIN_SHARE = 2.0 / 3.0
+
+
+def _title_key(title: str) -> str:
+    return re.sub(r"\s+", " ", (title or "").replace("_", " ")).strip().lower()
+
+
+def _page_url(title: str) -> str:
+    return f"https://en.wikipedia.org/wiki/{urllib.parse.quote(title.replace(' ', '_'))}"
+
+
+class OfflineWikipediaProvider:
+    """
+    Wikipedia abstracts served from a local SQLite FTS5 index (no network).
+      - summary(title) / search(query, limit) return the same shapes as
+        WikipediaProvider, so callers can try this first and fall back online
+      - title lookup is an indexed exact match (case/underscore-insensitive),
+        search is FTS5 bm25 with the title weighted above the abstract
+      - the index is built once from the abstracts dump with build_index()
+        (or `python -m network.providers.wikipedia_offline build <dump>`)
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH):
+        self.index_path = index_path
+        self._conn = None
+        self._lock = Lock()
+
+    def available(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self.available():
+                raise FileNotFoundError(f"No offline Wikipedia index at {self.index_path}")
+            uri = "file:" + urllib.parse.quote(os.path.abspath(self.index_path)) + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
+
+    def summary(self, title: str) -> Dict[str, Any]:
+        title = (title or "").strip()
+        if not title:
+            raise ValueError("Empty title")
+
+        with self._lock:
+            row = self._db().execute(
+                "SELECT title, abstract, url FROM pages WHERE title_key = ?", (_title_key(title),)
+            ).fetchone()
+        if not row:
+            raise KeyError(title)
+
+        return {"title": row[0], "extract": row[1], "url": row[2]}
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        query = (query or "").strip()
+        if not query:
+            raise ValueError("Empty query")
+
+        limit = max(1, min(int(limit), 10))
+
+        words = _WORD_RE.findall(query.lower())
+        words = [w for w in words if w not in _STOPWORDS] or words
+        if not words:
+            return []
+
+        # quoted terms: user text never reaches the FTS5 query syntax
+        terms = ['"' + w.replace('"', '""') + '"' for w in words]
+        rows = self._match(" ".join(terms), limit)
+        if not rows and len(terms) > 1:
+            # any one word would match nearly anything: keep hits that cover most of the query
+            wanted = set(words)
+            need = math.ceil(len(wanted) * _OR_MIN_SHARE)
+            rows = [
+                row for row in self._match(" OR ".join(terms), limit * 4)
+                if len(wanted & set(_WORD_RE.findall(f"{row[0]} {row[3]}".lower()))) >= need
+            ][:limit]
+
+        return [{"title": t, "snippet": snip, "url": url} for t, snip, url, _abstract in rows]
+
+    def _match(self, expr: str, limit: int) -> List[Tuple[str, str, str, str]]:
+        with self._lock:
+            return self._db().execute(
+                "SELECT p.title, snippet(pages_fts, 1, '<span class=\"searchmatch\">', '</span>', '...', 24), p.url,"
+                " p.abstract"
+                " FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid"
+                " WHERE pages_fts MATCH ?"
+                " ORDER BY bm25(pages_fts, 10.0, 1.0) LIMIT ?",
+                (expr, limit),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def iter_abstracts(dump_path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Stream (title, url, abstract) out of an abstracts dump (.xml or .xml.gz).
+    Each <doc> is cleared once read, so memory stays flat on the full dump.
+    """
+    opener = gzip.open if dump_path.endswith(".gz") else open
+    with opener(dump_path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _event, root = next(context)
+        for event, elem in context:
+            if event != "end" or elem.tag != "doc":
+                continue
+            title = (elem.findtext("title") or "").strip()
+            if title.startswith(_TITLE_PREFIX):
+                title = title[len(_TITLE_PREFIX):]
+            url = (elem.findtext("url") or "").strip()
+            abstract = re.sub(r"\s+", " ", elem.findtext("abstract") or "").strip()
+            root.clear()
+
+            # infobox/table leftovers and empty stubs are useless as answers
+            if not title or len(abstract) < 20 or abstract[0] in "|{":
+                continue
+            yield title, url or _page_url(title), abstract
+
+
+def build_index(dump_path: str, index_path: str = DEFAULT_INDEX_PATH, batch_size: int = 5000) -> int:
+    """Build a fresh index next to index_path and swap it in; returns the page count."""
+    tmp_path = index_path + ".building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    folder = os.path.dirname(index_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE pages ("
+        " id INTEGER PRIMARY KEY,"
+        " title TEXT NOT NULL,"
+        " title_key TEXT NOT NULL UNIQUE,"
+        " url TEXT NOT NULL,"
+        " abstract TEXT NOT NULL)"
+    )
+    # external-content FTS table: the text is stored once, in pages
+    conn.execute(
+        "CREATE VIRTUAL TABLE pages_fts USING fts5("
+        " title, abstract, content='pages', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2')"
+    )
+
+    count = 0
+    batch: List[Tuple[str, str, str, str]] = []
+    conn.execute("BEGIN")
+    for title, url, abstract in iter_abstracts(dump_path):
+        batch.append((title, _title_key(title), url, abstract))
+        if len(batch) >= batch_size:
+            count += _insert(conn, batch)
+            batch = []
+    count += _insert(conn, batch)
+    conn.execute("COMMIT")
+
+    conn.execute("INSERT INTO pages_fts(pages_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO pages_fts(pages_fts) VALUES ('optimize')")
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, index_path)
+    return count
+
+
+def _insert(conn: sqlite3.Connection, batch: List[Tuple[str, str, str, str]]) -> int:
+    if not batch:
+        return 0
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO pages (title, title_key, url, abstract) VALUES (?, ?, ?, ?)", batch
+    )
+    return conn.total_changes - before
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline Wikipedia abstracts index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    build = sub.add_parser("build", help="build the index from enwiki-*-abstract.xml(.gz)")
+    build.add_argument("dump")
+    build.add_argument("--index", default=DEFAULT_INDEX_PATH)
+
+    look = sub.add_parser("search", help="query an existing index")
+    look.add_argument("query")
+    look.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    look.add_argument("--limit", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        count = build_index(args.dump, args.index)
+        print(f"[WikiOffline] Indexed {count} pages into {args.index} in {time.perf_counter() - start:.1f}s")
+    else:
+        wiki = OfflineWikipediaProvider(args.index)
+        for item in wiki.search(args.query, limit=args.limit):
+            print(item)
+
+
+if __name__ == "__main__":
+    main()
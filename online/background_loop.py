@@ -0,0 +1,59 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, List, Optional
+
+# ============================================================
+# One long-lived asyncio loop on a daemon thread.
+# Sync callers (mic_listener, text_chat, cron scripts) run the async
+# online pipeline here, so they share one HTTP session, one rate-limit
+# budget and any background refresh tasks.
+# ============================================================
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+# coroutine functions run on the loop at interpreter exit (e.g. closing HTTP sessions)
+_shutdown_hooks: List[Callable[[], Awaitable[Any]]] = []
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ares-online-loop", daemon=True)
+            thread.start()
+            _loop, _thread = loop, thread
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and block until it finishes."""
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("run_sync() called from the background loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def submit(coro: Awaitable[Any]) -> concurrent.futures.Future:
+    """Schedule a coroutine on the background loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def on_shutdown(hook: Callable[[], Awaitable[Any]]) -> None:
+    """Register a coroutine function to run on the loop when the process exits."""
+    _shutdown_hooks.append(hook)
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _loop is None or not _loop.is_running():
+        return
+    for hook in _shutdown_hooks:
+        try:
+            asyncio.run_coroutine_threadsafe(hook(), _loop).result(2.0)
+        except Exception:
+            continue
+    _loop.call_soon_threadsafe(_loop.stop)
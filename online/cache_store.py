@@ -0,0 +1,430 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# ============================================================
+# ARES persistent answer cache
+# - SQLite in WAL mode: readers never block the writer, and the
+#   text_chat + mic_listener processes can share one file safely.
+# - Indexed lookups by normalized query key.
+# - LRU eviction once the store grows past max_entries (tracked with a
+#   running row count; the exact count is only taken when it overflows).
+# - Expired rows are purged by a background thread, never on read.
+# - Optional in-process LRU tier in front (TieredCache), so repeated
+#   questions are answered without touching the disk at all.
+# - Stale-while-revalidate: a row stays readable as "stale" until
+#   stale_until, so callers can answer at once and refresh later.
+# - Negative entries ("no answer found") back off along a retry
+#   schedule instead of sharing the normal TTL.
+# - A small query log (key, time) so recurring questions can be
+#   prefetched; rows are buffered in memory and written in batches
+#   by the purge thread, which also trims it to query_log_days.
+# - Short-lived leases, so only one process fetches a given query
+#   while the others wait for its answer to land here.
+# ============================================================
+
+# last_used is only rewritten when it is older than this, so a burst of
+# cache hits does not turn into a burst of SD-card writes.
+TOUCH_GRANULARITY_SECONDS = 60.0
+# buffered query-log rows are written at least this often (and past QUERY_LOG_BATCH rows)
+QUERY_LOG_FLUSH_SECONDS = 60.0
+QUERY_LOG_BATCH = 200
+# LRU eviction trims the store to this share of max_entries, so the exact
+# (full-scan) row count runs once per batch of inserts, not on every write
+EVICT_TO_FRACTION = 0.9
+
+
+class CacheEntry(NamedTuple):
+    answer: str
+    expires: float
+    stale_until: float
+    negative: bool = False
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) <= self.expires
+
+
+class AnswerCache:
+    """
+    Disk-backed key -> answer store with per-row expiry.
+    Thread-safe within a process, WAL-safe across processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 5000,
+        purge_interval: float = 600.0,
+        query_log_days: float = 30.0,
+    ):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.purge_interval = float(purge_interval)
+        self.query_log_days = float(query_log_days)
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        # running count of answers rows: exact at open, after each purge and on
+        # overflow; in between it does not see other processes' inserts
+        self._rows = self._count_rows()
+        self._log_lock = threading.Lock()
+        self._log_buffer: List[Tuple[str, float]] = []
+        self._stop = threading.Event()
+        self._purger: Optional[threading.Thread] = None
+        if self.purge_interval > 0:
+            self._purger = threading.Thread(target=self._purge_loop, name="ares-cache-purge", daemon=True)
+            self._purger.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # isolation_level=None -> autocommit; every statement is its own short transaction
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " answer TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " expires REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " stale_until REAL NOT NULL DEFAULT 0,"
+            " misses INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._migrate(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used)")
+        conn.execute("DROP INDEX IF EXISTS answers_expires")
+        conn.execute("CREATE INDEX IF NOT EXISTS answers_stale_until ON answers(stale_until)")
+        conn.execute("CREATE TABLE IF NOT EXISTS query_log (key TEXT NOT NULL, ts REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS query_log_ts ON query_log(ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        # caches created before stale/negative support lack these columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(answers)")}
+        if "stale_until" not in columns:
+            conn.execute("ALTER TABLE answers ADD COLUMN stale_until REAL NOT NULL DEFAULT 0")
+            conn.execute("UPDATE answers SET stale_until = expires")
+        if "misses" not in columns:
+            conn.execute("ALTER TABLE answers ADD COLUMN misses INTEGER NOT NULL DEFAULT 0")
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry.answer if entry else None
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Return the row if it is fresh (or, with allow_stale, still inside its stale window)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, expires, stale_until, last_used, misses FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            answer, expires, stale_until, last_used, misses = row
+            if misses:
+                # negatives are never served stale; the longer stale_until only keeps the miss count
+                stale_until = expires
+            if now > (max(expires, stale_until) if allow_stale else expires):
+                # too old: leave it for the purge thread instead of writing on the read path
+                return None
+            if now - last_used > TOUCH_GRANULARITY_SECONDS:
+                self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        return CacheEntry(answer, expires, stale_until, misses > 0)
+
+    def set(self, key: str, answer: str, ttl_seconds: float, stale_seconds: float = 0.0) -> CacheEntry:
+        """Store a real answer; it is fresh for ttl_seconds, then stale for stale_seconds more."""
+        now = time.time()
+        expires = now + float(ttl_seconds)
+        stale_until = expires + max(0.0, float(stale_seconds))
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM answers WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, created, expires, last_used, stale_until, misses)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, answer, now, expires, now, stale_until),
+            )
+            if not exists:
+                self._inserted_locked()
+        return CacheEntry(answer, expires, stale_until)
+
+    def set_negative(self, key: str, answer: str, ttl_schedule: Sequence[float]) -> CacheEntry:
+        """
+        Store a "nothing found" answer. Consecutive misses for the same key
+        walk along ttl_schedule (e.g. 5 min, 15 min, 1 h); negatives are never served stale.
+        The row outlives its expiry by the longest step, so the purge thread does not
+        reset the miss count before the next miss can read it.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT misses FROM answers WHERE key = ?", (key,)).fetchone()
+            misses = int(row[0]) if row else 0
+            ttl = float(ttl_schedule[min(misses, len(ttl_schedule) - 1)])
+            expires = now + ttl
+            keep_until = expires + max(float(t) for t in ttl_schedule)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, created, expires, last_used, stale_until, misses)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, answer, now, expires, now, keep_until, misses + 1),
+            )
+            if not row:
+                self._inserted_locked()
+        return CacheEntry(answer, expires, expires, True)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._rows = max(0, self._rows - cur.rowcount)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM answers WHERE MAX(expires, stale_until) < ?", (now,))
+            self._conn.execute("DELETE FROM query_log WHERE ts < ?", (now - self.query_log_days * 86400,))
+            # background thread: resync the running count (other processes write too)
+            self._rows = self._count_rows()
+            self._evict_locked()
+            return cur.rowcount
+
+    def keys(self, prefix: str = "") -> List[str]:
+        """Keys of the stored real answers (not expired, not negative) that start with prefix."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM answers WHERE substr(key, 1, ?) = ? AND misses = 0 AND stale_until >= ?",
+                (len(prefix), prefix, time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def record_query(self, key: str, ts: Optional[float] = None) -> None:
+        """Log a question; kept in memory until the next flush_query_log()."""
+        with self._log_lock:
+            self._log_buffer.append((key, ts or time.time()))
+            full = len(self._log_buffer) >= QUERY_LOG_BATCH
+        if full and self._purger is None:
+            self.flush_query_log()
+
+    def flush_query_log(self) -> None:
+        with self._log_lock:
+            rows, self._log_buffer = self._log_buffer, []
+        if not rows:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany("INSERT INTO query_log (key, ts) VALUES (?, ?)", rows)
+        except sqlite3.Error:
+            with self._log_lock:
+                self._log_buffer[:0] = rows  # try again next round
+
+    def query_history(self, since: float) -> List[Tuple[str, float]]:
+        """(key, ts) for every logged question asked after since, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, ts FROM query_log WHERE ts >= ? ORDER BY ts", (since,)
+            ).fetchall()
+        with self._log_lock:
+            pending = [r for r in self._log_buffer if r[1] >= since]
+        return sorted(rows + pending, key=lambda r: r[1])
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Claim key for owner unless another owner holds an unexpired lease."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, owner, now + float(ttl_seconds)),
+            )
+            row = self._conn.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+        return bool(row) and row[0] == owner
+
+    def release_lease(self, key: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def lease_held(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count_rows()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush_query_log()
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+    def _count_rows(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def _inserted_locked(self) -> None:
+        self._rows += 1
+        if 0 < self.max_entries < self._rows:
+            self._rows = self._count_rows()
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        # least recently used rows go first, down to EVICT_TO_FRACTION of max_entries
+        if self.max_entries <= 0 or self._rows <= self.max_entries:
+            return
+        overflow = self._rows - int(self.max_entries * EVICT_TO_FRACTION)
+        cur = self._conn.execute(
+            "DELETE FROM answers WHERE key IN"
+            " (SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+            (overflow,),
+        )
+        self._rows -= cur.rowcount
+
+    def _purge_loop(self) -> None:
+        tick = min(self.purge_interval, QUERY_LOG_FLUSH_SECONDS)
+        next_purge = time.monotonic() + self.purge_interval
+        while not self._stop.wait(tick):
+            try:
+                self.flush_query_log()
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + self.purge_interval
+                    self.purge_expired()
+            except Exception:
+                # another process may hold the write lock; try again next round
+                continue
+
+
+class MemoryTier:
+    """
+    Bounded in-process LRU of key -> CacheEntry.
+    Not shared between processes; the disk tier is the source of truth.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = int(max_entries)
+        self._items: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry.answer if entry else None
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if not entry:
+                return None
+            if now > max(entry.expires, entry.stale_until):
+                self._items.pop(key, None)
+                return None
+            if not allow_stale and now > entry.expires:
+                return None
+            self._items.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class TieredCache:
+    """
+    Memory LRU in front of the persistent AnswerCache.
+      - get: fresh answer, memory first, then disk (a disk hit is promoted to memory)
+      - peek: fresh memory entry only, for callers that must not block on the disk
+      - lookup: like get, but may return a stale entry for stale-while-revalidate
+      - set / set_negative: write both tiers with the same expiry
+      - stats: hit/miss counters per tier
+    """
+
+    def __init__(self, disk: AnswerCache, memory: Optional[MemoryTier] = None):
+        self.disk = disk
+        self.memory = memory if memory is not None else MemoryTier()
+        self._counters = {
+            "memory_hits": 0, "memory_misses": 0,
+            "disk_hits": 0, "disk_misses": 0,
+            "stale_hits": 0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.lookup(key, allow_stale=False)
+        return entry.answer if entry else None
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Fresh memory-tier entry only (never touches the disk); None means "ask lookup()"."""
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            self._count("memory_hits")
+        return entry
+
+    def lookup(self, key: str, allow_stale: bool = True) -> Optional[CacheEntry]:
+        entry = self.memory.get_entry(key, allow_stale=allow_stale)
+        if entry is not None and not entry.is_fresh():
+            # another process may have refreshed it on disk already
+            newer = self.disk.get_entry(key, allow_stale=allow_stale)
+            if newer is not None and newer.expires > entry.expires:
+                self.memory.put(key, newer)
+                entry = newer
+        if entry is not None:
+            self._count("memory_hits")
+        else:
+            self._count("memory_misses")
+            entry = self.disk.get_entry(key, allow_stale=allow_stale)
+            if entry is None:
+                self._count("disk_misses")
+                return None
+            self._count("disk_hits")
+            self.memory.put(key, entry)
+
+        if not entry.is_fresh():
+            self._count("stale_hits")
+        return entry
+
+    def set(self, key: str, answer: str, ttl_seconds: float, stale_seconds: float = 0.0) -> None:
+        self.memory.put(key, self.disk.set(key, answer, ttl_seconds, stale_seconds))
+
+    def set_negative(self, key: str, answer: str, ttl_schedule: Sequence[float]) -> None:
+        self.memory.put(key, self.disk.set_negative(key, answer, ttl_schedule))
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self._counters)
+        return {
+            "memory": {"hits": c["memory_hits"], "misses": c["memory_misses"], "size": len(self.memory)},
+            "disk": {"hits": c["disk_hits"], "misses": c["disk_misses"]},
+            "stale_hits": c["stale_hits"],
+        }
@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+# ============================================================
+# ARES near-duplicate question index
+# - Character n-grams of each word (padded: " py", "pyt", ...), so
+#   word order does not matter and small spelling variants
+#   ("frances capital" / "capital france") still overlap.
+# - Jaccard similarity over the n-gram sets, candidates found through
+#   an inverted index (n-gram -> keys), never a full scan.
+# - On top of the score, the words must agree: at most one word may
+#   differ, and only as a spelling variant of its counterpart. Nothing
+#   added or dropped ("diabetes" / "type diabetes"), and negations,
+#   compass directions and numbers never differ ("install" /
+#   "uninstall", "work" / "not work", "east" / "west", "2" / "3").
+# - Bounded: the oldest keys are dropped past max_entries.
+# ============================================================
+
+
+def ngrams(text: str, n: int = 3) -> FrozenSet[str]:
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f" {word} "
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return frozenset(grams)
+
+
+NEGATIONS = frozenset((
+    "not", "no", "never", "without", "none", "nor", "dont", "doesnt", "didnt", "isnt",
+    "arent", "wasnt", "cant", "cannot", "wont", "shouldnt", "anti", "non", "against",
+))
+NEGATION_PREFIXES = ("un", "non", "dis", "anti", "de", "in", "im", "ir", "il")
+DIRECTIONS = frozenset((
+    "north", "south", "east", "west", "northern", "southern", "eastern", "western",
+    "northeast", "northwest", "southeast", "southwest", "left", "right", "up", "down",
+))
+# spelling variants: word-level n-gram Jaccard at least this
+VARIANT_SIMILARITY = 0.5
+
+
+def _word(w: str) -> str:
+    # "frances" / "france", "capitals" / "capital"
+    return w[:-1] if len(w) > 3 and w.endswith("s") else w
+
+
+def _guarded(w: str) -> bool:
+    return w in NEGATIONS or w in DIRECTIONS or any(ch.isdigit() for ch in w)
+
+
+def same_words(a: FrozenSet[str], b: FrozenSet[str], n: int = 3) -> bool:
+    """
+    True when two word sets name the same question: identical up to plural /
+    possessive "s", except for at most one substituted word that is a spelling
+    variant of the other (not a guarded word, not a negating prefix of it).
+    """
+    only_a = {_word(w) for w in a} - {_word(w) for w in b}
+    only_b = {_word(w) for w in b} - {_word(w) for w in a}
+    if not only_a and not only_b:
+        return True
+    if len(only_a) != 1 or len(only_b) != 1:
+        return False
+    x, y = next(iter(only_a)), next(iter(only_b))
+    if _guarded(x) or _guarded(y):
+        return False
+    for prefix in NEGATION_PREFIXES:
+        if x == prefix + y or y == prefix + x:
+            return False
+    gx, gy = ngrams(x, n), ngrams(y, n)
+    return len(gx & gy) / float(len(gx | gy)) >= VARIANT_SIMILARITY
+
+
+class NgramIndex:
+    def __init__(self, threshold: float = 0.8, n: int = 3, max_entries: int = 5000):
+        self.threshold = float(threshold)
+        self.n = int(n)
+        self.max_entries = int(max_entries)
+
+        self._lock = threading.Lock()
+        # key -> (n-grams, words), oldest first
+        self._entries: "OrderedDict[str, Tuple[FrozenSet[str], FrozenSet[str]]]" = OrderedDict()
+        self._postings: Dict[str, Set[str]] = {}
+
+    def add(self, key: str, text: str) -> None:
+        grams = ngrams(text, self.n)
+        if not grams:
+            return
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = (grams, frozenset(text.split()))
+            for g in grams:
+                self._postings.setdefault(g, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        for key, text in items:
+            self.add(key, text)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for g in entry[0]:
+            keys = self._postings.get(g)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[g]
+
+    def best(self, text: str) -> Optional[Tuple[str, float]]:
+        """Most similar stored key with its score, if it reaches the threshold."""
+        grams = ngrams(text, self.n)
+        if not grams:
+            return None
+        words = frozenset(text.split())
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for g in grams:
+                for key in self._postings.get(g, ()):
+                    shared[key] = shared.get(key, 0) + 1
+
+            best: Optional[Tuple[str, float]] = None
+            for key, common in shared.items():
+                other, other_words = self._entries[key]
+                score = common / float(len(grams) + len(other) - common)
+                if score < self.threshold or not same_words(words, other_words, self.n):
+                    continue
+                if best is None or score > best[1]:
+                    best = (key, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,124 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+# ============================================================
+# ARES persistent geocoding index
+# - Place name -> (lat, lon, display name), never expires:
+#   coordinates do not move, so each city is geocoded once.
+# - Several aliases can point at one place ("bucharest",
+#   "bucuresti", "bucharest romania").
+# - Names are normalized: lowercase, no diacritics, no punctuation.
+# - All aliases are mirrored in memory; SQLite (WAL) is the shared copy.
+# ============================================================
+
+Place = Tuple[float, float, str]
+
+
+def normalize_place(name: str) -> str:
+    """'  São Paulo, BR ' -> 'sao paulo br'"""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.lower().replace("ß", "ss")
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class GeocodeIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._aliases: Dict[str, int] = {}
+        self._places: Dict[int, Place] = {}
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " id INTEGER PRIMARY KEY,"
+            " lat REAL NOT NULL,"
+            " lon REAL NOT NULL,"
+            " display TEXT NOT NULL,"
+            " UNIQUE(lat, lon))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS aliases ("
+            " alias TEXT PRIMARY KEY,"
+            " place_id INTEGER NOT NULL REFERENCES places(id))"
+        )
+        return conn
+
+    def _load(self) -> None:
+        with self._lock:
+            for pid, lat, lon, display in self._conn.execute("SELECT id, lat, lon, display FROM places"):
+                self._places[pid] = (lat, lon, display)
+            for alias, pid in self._conn.execute("SELECT alias, place_id FROM aliases"):
+                self._aliases[alias] = pid
+
+    def _refresh_alias_locked(self, alias: str) -> Optional[int]:
+        # another process (text_chat vs mic_listener) may have added it since we loaded
+        row = self._conn.execute(
+            "SELECT p.id, p.lat, p.lon, p.display FROM aliases a JOIN places p ON p.id = a.place_id"
+            " WHERE a.alias = ?",
+            (alias,),
+        ).fetchone()
+        if not row:
+            return None
+        pid, lat, lon, display = row
+        self._places[pid] = (lat, lon, display)
+        self._aliases[alias] = pid
+        return pid
+
+    def lookup(self, name: str) -> Optional[Place]:
+        alias = normalize_place(name)
+        if not alias:
+            return None
+        with self._lock:
+            pid = self._aliases.get(alias)
+            if pid is None:
+                pid = self._refresh_alias_locked(alias)
+            if pid is None:
+                return None
+            return self._places.get(pid)
+
+    def add(self, name: str, lat: float, lon: float, display: str, aliases: Iterable[str] = ()) -> None:
+        """Store a place under name and any extra aliases (e.g. the geocoder's own spelling)."""
+        keys = {normalize_place(n) for n in (name, display, *aliases) if n}
+        keys.discard("")
+        lat, lon = round(float(lat), 5), round(float(lon), 5)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO places (lat, lon, display) VALUES (?, ?, ?)", (lat, lon, display)
+            )
+            pid, display = self._conn.execute(
+                "SELECT id, display FROM places WHERE lat = ? AND lon = ?", (lat, lon)
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO aliases (alias, place_id) VALUES (?, ?)", [(k, pid) for k in keys]
+            )
+            self._places[pid] = (lat, lon, display)
+            for k in keys:
+                self._aliases[k] = pid
+
+    def add_alias(self, alias: str, existing_name: str) -> bool:
+        """Point a new spelling at a place that is already indexed."""
+        key = normalize_place(alias)
+        with self._lock:
+            pid = self._aliases.get(normalize_place(existing_name))
+            if pid is None or not key:
+                return False
+            self._conn.execute("INSERT OR REPLACE INTO aliases (alias, place_id) VALUES (?, ?)", (key, pid))
+            self._aliases[key] = pid
+            return True
+
+    def __len__(self) -> int:
+        return len(self._places)
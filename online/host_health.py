@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# ============================================================
+# ARES per-host health (circuit breaker + adaptive timeouts)
+# - closed: requests flow; consecutive failures are counted.
+# - open: after failure_threshold failures in a row the host is
+#   skipped outright for a cooldown (doubling on every failed probe).
+# - half-open: once the cooldown is over, a single probe request is
+#   let through; success closes the breaker, failure re-opens it.
+# - Timeouts follow each host's recent latency (p95 x factor),
+#   clamped, so a slow-but-alive host is not cut off and a dead one
+#   does not cost the full default timeout every time.
+# ============================================================
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Host:
+    __slots__ = ("state", "failures", "opened_at", "cooldown", "probing", "latencies")
+
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+
+class HostHealth:
+    def __init__(
+        self,
+        default_timeout: float = 10.0,
+        min_timeout: float = 2.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+        latency_window: int = 50,
+        min_samples: int = 5,
+        timeout_factor: float = 3.0,
+    ):
+        self.default_timeout = float(default_timeout)
+        self.min_timeout = float(min_timeout)
+        self.failure_threshold = int(failure_threshold)
+        self.base_cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.latency_window = int(latency_window)
+        self.min_samples = int(min_samples)
+        self.timeout_factor = float(timeout_factor)
+
+        self._hosts: Dict[str, _Host] = {}
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def _get(self, host: str) -> _Host:
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = _Host(self.latency_window)
+        return h
+
+    def allow(self, host: str) -> bool:
+        """False while the host's breaker is open (or another caller is probing it)."""
+        with self._lock:
+            h = self._get(host)
+            if h.state == CLOSED:
+                return True
+            if h.state == OPEN and time.monotonic() >= h.opened_at + h.cooldown:
+                h.state = HALF_OPEN
+                h.probing = False
+            if h.state == HALF_OPEN and not h.probing:
+                h.probing = True
+                return True
+            self.skipped += 1
+            return False
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            h = self._hosts.get(host)
+            return h is not None and h.state != CLOSED
+
+    def release(self, host: str) -> None:
+        """A probe ended without a verdict (e.g. cancelled); let the next caller probe."""
+        with self._lock:
+            h = self._hosts.get(host)
+            if h is not None and h.state == HALF_OPEN:
+                h.probing = False
+
+    def record_success(self, host: str, latency: float) -> None:
+        """The host answered (any status that is not its own fault, 4xx included)."""
+        with self._lock:
+            h = self._get(host)
+            h.latencies.append(float(latency))
+            h.failures = 0
+            h.state = CLOSED
+            h.probing = False
+            h.cooldown = 0.0
+
+    def record_failure(self, host: str) -> None:
+        """Timeout, connection error or 5xx."""
+        with self._lock:
+            h = self._get(host)
+            h.failures += 1
+            if h.state == HALF_OPEN:
+                # failed probe: back off harder
+                h.cooldown = min(self.max_cooldown, max(self.base_cooldown, h.cooldown * 2))
+            elif h.state == CLOSED and h.failures >= self.failure_threshold:
+                h.cooldown = self.base_cooldown
+            else:
+                return
+            h.state = OPEN
+            h.opened_at = time.monotonic()
+            h.probing = False
+
+    def latency(self, host: str, pct: float = 50.0) -> Optional[float]:
+        """Observed response time percentile for host (None until it has samples)."""
+        with self._lock:
+            h = self._hosts.get(host)
+            if h is None or not h.latencies:
+                return None
+            ordered = sorted(h.latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+    def timeout_for(self, host: str) -> float:
+        with self._lock:
+            h = self._hosts.get(host)
+            if h is None or len(h.latencies) < self.min_samples:
+                return self.default_timeout
+            ordered = sorted(h.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        return max(self.min_timeout, min(self.default_timeout, p95 * self.timeout_factor))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hosts = list(self._hosts.items())
+        out: Dict[str, Dict[str, Any]] = {}
+        for host, h in hosts:
+            ordered = sorted(h.latencies)
+            p50: Optional[float] = ordered[len(ordered) // 2] if ordered else None
+            out[host] = {
+                "state": h.state,
+                "failures": h.failures,
+                "p50": p50,
+                "timeout": self.timeout_for(host),
+            }
+        return out
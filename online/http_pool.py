@@ -0,0 +1,272 @@
+import asyncio
+import functools
+import json
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # optional: fall back to the pooled requests session on threads
+    aiohttp = None
+
+# ============================================================
+# ARES shared HTTP session for online/*
+# - One requests.Session for the whole process: DNS, TCP and TLS
+#   are paid once per host, then connections are kept alive.
+# - Per-host connection limit (pool_block=True makes extra callers
+#   wait for a free connection instead of opening another one).
+# - Connection reuse statistics straight from the urllib3 pools.
+# - aget(): async GET on aiohttp when installed, otherwise the same
+#   pooled session on a small bounded thread pool.
+# - aget(parser=...) streams the body into an incremental parser
+#   (online/stream_parse.py) and stops reading once it has its
+#   record. Both clients ask for gzip and decode it on the fly.
+# - set_transport() swaps what aget() does (record/replay, see
+#   online/replay.py); network_get() is always the real thing.
+# ============================================================
+
+# How many distinct hosts keep a warm pool (web_search talks to ~15)
+POOL_HOSTS = 32
+# Max simultaneous connections to a single host
+POOL_MAX_PER_HOST = 4
+
+# Threads used by aget() when aiohttp is not installed
+BLOCKING_WORKERS = 8
+
+# Streaming reads: chunk size, and how much of the rest of a body is still
+# read after the parser is done so the connection can go back to the pool
+# (beyond that it is cheaper to drop the connection than to download the rest)
+STREAM_CHUNK_BYTES = 8 * 1024
+STREAM_DRAIN_BYTES = 32 * 1024
+
+_session: Optional[requests.Session] = None
+_adapter: Optional[HTTPAdapter] = None
+_lock = threading.Lock()
+
+_blocking_pool: Optional[ThreadPoolExecutor] = None
+# replaces aget() when set: async (url, params, headers, timeout, parser) -> HttpResult
+_transport: Optional[Callable[..., Any]] = None
+# aiohttp sessions are bound to one event loop
+_aio_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+# host -> [requests, connections] seen by the aiohttp trace hooks
+_aio_counts: Dict[str, list] = {}
+
+
+def get_session() -> requests.Session:
+    """The shared, pooled keep-alive session (created on first use)."""
+    global _session, _adapter
+    with _lock:
+        if _session is None:
+            _adapter = HTTPAdapter(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=POOL_MAX_PER_HOST,
+                pool_block=True,
+                max_retries=0,  # callers own the retry policy
+            )
+            session = requests.Session()
+            session.mount("https://", _adapter)
+            session.mount("http://", _adapter)
+            _session = session
+        return _session
+
+
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Per host: requests sent, connections opened and requests that reused
+    an existing connection. reused == requests - connections.
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    for host, (n_req, n_conn) in list(_aio_counts.items()):
+        stats[host] = {"requests": n_req, "connections": n_conn, "reused": max(0, n_req - n_conn)}
+    if _adapter is None:
+        return stats
+
+    pools = _adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        n_req = int(getattr(pool, "num_requests", 0))
+        n_conn = int(getattr(pool, "num_connections", 0))
+        # http:// and https:// pools of one host are reported together
+        entry = stats.setdefault(pool.host, {"requests": 0, "connections": 0, "reused": 0})
+        entry["requests"] += n_req
+        entry["connections"] += n_conn
+        entry["reused"] += max(0, n_req - n_conn)
+    return stats
+
+
+def close() -> None:
+    global _session, _adapter
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _adapter = None
+
+
+# ----------------------------
+# Async client
+# ----------------------------
+class HttpResult:
+    """
+    Response independent of the client that fetched it: either the fully
+    read body, or (streamed with a parser) an empty body and parser.result.
+    """
+
+    __slots__ = ("status", "headers", "body", "parsed")
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, parsed: Any = None):
+        self.status = int(status)
+        self.headers = headers
+        self.body = body
+        self.parsed = parsed
+
+    @property
+    def text(self) -> str:
+        charset = "utf-8"
+        ctype = self.headers.get("Content-Type") or self.headers.get("content-type") or ""
+        if "charset=" in ctype:
+            charset = ctype.split("charset=", 1)[1].split(";")[0].strip() or charset
+        return self.body.decode(charset, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+def _count_aio(host: str, index: int) -> None:
+    with _lock:
+        _aio_counts.setdefault(host, [0, 0])[index] += 1
+
+
+async def _on_request_start(session, ctx, params) -> None:
+    _count_aio(params.url.host or "", 0)
+
+
+async def _on_connection_create_end(session, ctx, params) -> None:
+    ctx.new_connection = True
+
+
+async def _on_request_end(session, ctx, params) -> None:
+    if getattr(ctx, "new_connection", False):
+        _count_aio(params.url.host or "", 1)
+
+
+def _aio_session():
+    loop = asyncio.get_running_loop()
+    session = _aio_sessions.get(loop)
+    if session is None or session.closed:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(_on_request_start)
+        trace.on_connection_create_end.append(_on_connection_create_end)
+        trace.on_request_end.append(_on_request_end)
+        connector = aiohttp.TCPConnector(limit_per_host=POOL_MAX_PER_HOST, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+        _aio_sessions[loop] = session
+    return session
+
+
+def _get_blocking_pool() -> ThreadPoolExecutor:
+    global _blocking_pool
+    with _lock:
+        if _blocking_pool is None:
+            _blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="ares-http")
+        return _blocking_pool
+
+
+def _blocking_get(url: str, params, headers, timeout: float, parser=None) -> HttpResult:
+    resp = get_session().get(url, params=params, headers=headers, timeout=timeout, stream=parser is not None)
+    if parser is None or resp.status_code >= 300:
+        return HttpResult(resp.status_code, dict(resp.headers), resp.content)
+
+    try:
+        p = parser()
+        chunks = resp.iter_content(STREAM_CHUNK_BYTES)  # gzip-decoded
+        for chunk in chunks:
+            if p.feed(chunk):
+                drained = 0
+                for rest in chunks:
+                    drained += len(rest)
+                    if drained > STREAM_DRAIN_BYTES:
+                        break
+                break
+        else:
+            p.close()
+        return HttpResult(resp.status_code, dict(resp.headers), b"", parsed=p.result)
+    finally:
+        resp.close()
+
+
+async def _aio_stream(resp, parser) -> Any:
+    p = parser()
+    while True:
+        chunk = await resp.content.read(STREAM_CHUNK_BYTES)
+        if not chunk:
+            p.close()
+            return p.result
+        if p.feed(chunk):
+            drained = 0
+            while drained <= STREAM_DRAIN_BYTES:
+                rest = await resp.content.read(STREAM_CHUNK_BYTES)
+                if not rest:
+                    break
+                drained += len(rest)
+            return p.result
+
+
+def set_transport(transport: Optional[Callable[..., Any]]) -> None:
+    """Route every aget() through transport (None restores the network)."""
+    global _transport
+    _transport = transport
+
+
+async def aget(
+    url: str,
+    params=None,
+    headers=None,
+    timeout: float = 10.0,
+    parser: Optional[Callable[[], Any]] = None,
+) -> HttpResult:
+    """
+    Async GET that always returns an HttpResult (any status code).
+    parser: factory for a stream_parse.StreamParser; successful bodies are fed
+    to it chunk by chunk and HttpResult.parsed holds its result.
+    """
+    if _transport is not None:
+        return await _transport(url, params, headers, timeout, parser)
+    return await network_get(url, params, headers, timeout, parser)
+
+
+async def network_get(
+    url: str,
+    params=None,
+    headers=None,
+    timeout: float = 10.0,
+    parser: Optional[Callable[[], Any]] = None,
+) -> HttpResult:
+    """aget() without the transport override."""
+    if aiohttp is not None:
+        session = _aio_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with session.get(url, params=params, headers=headers, timeout=client_timeout) as resp:
+            if parser is None or resp.status >= 300:
+                body = await resp.read()
+                return HttpResult(resp.status, dict(resp.headers), body)
+            parsed = await _aio_stream(resp, parser)
+            return HttpResult(resp.status, dict(resp.headers), b"", parsed=parsed)
+
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_blocking_get, url, params, headers, timeout, parser)
+    return await loop.run_in_executor(_get_blocking_pool(), call)
+
+
+async def aclose() -> None:
+    """Close the aiohttp session bound to the running loop (if any)."""
+    session = _aio_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
@@ -0,0 +1,134 @@
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from online import web_search
+
+# ============================================================
+# ARES proactive prefetch
+# - Mines the web-cache query log and the conversation logs for
+#   questions asked on several different days (morning weather,
+#   the usual exchange rate, ...).
+# - Shortly before the usual time, refreshes those answers so the
+#   first question of the day is a cache hit.
+# - Stays inside the rate-limit budget: a few queries per run, and
+#   background requests never queue for a slot (BACKGROUND_MAX_WAIT).
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONVERSATION_LOG_DIR = BASE_DIR / "logs" / "conversations"
+
+PREFETCH_LOOKBACK_DAYS = 14
+PREFETCH_MIN_DAYS = 3              # asked on at least this many different days
+PREFETCH_LEAD_SECONDS = 90 * 60    # start refreshing this long before the usual time
+PREFETCH_SLACK_SECONDS = 5 * 60    # "fresh until a few minutes before" is good enough
+PREFETCH_MAX_PER_RUN = 5
+PREFETCH_INTERVAL_SECONDS = 15 * 60
+
+
+@dataclass
+class RecurringQuery:
+    query: str
+    days: int            # number of distinct days it was asked
+    usual_minute: int    # minute of the day it is usually first asked (median)
+
+
+def _conversation_questions(since: float) -> Iterable[Tuple[str, float]]:
+    """User lines from logs/conversations that look like web questions."""
+    cutoff = datetime.fromtimestamp(since).date().isoformat()
+    for path in sorted(CONVERSATION_LOG_DIR.glob("*.jsonl")):
+        if path.stem < cutoff:
+            continue
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    ts = datetime.fromisoformat(entry["ts"]).timestamp()
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if entry.get("role") != "user" or ts < since:
+                    continue
+                text = (entry.get("text") or "").strip()
+                if text.startswith("You:"):
+                    text = text[4:].strip()
+                if text and web_search.intent_hint(text):
+                    yield web_search._normalize_query(text), ts
+
+
+def mine_recurring(now: Optional[float] = None) -> List[RecurringQuery]:
+    now = now or time.time()
+    since = now - PREFETCH_LOOKBACK_DAYS * 86400
+
+    # cache key -> day -> first minute of that day it was asked; rephrasings of
+    # one question ("weather berlin", "whats the weather in berlin") count together
+    first_ask: Dict[str, Dict[str, int]] = defaultdict(dict)
+    wording: Dict[str, str] = {}
+    sources = [web_search.query_history(since), _conversation_questions(since)]
+    for source in sources:
+        for query, ts in source:
+            key = web_search._cache_key(query)
+            wording[key] = query
+            dt = datetime.fromtimestamp(ts)
+            day = dt.date().isoformat()
+            minute = dt.hour * 60 + dt.minute
+            seen = first_ask[key].get(day)
+            if seen is None or minute < seen:
+                first_ask[key][day] = minute
+
+    recurring = [
+        RecurringQuery(wording[key], len(days), int(statistics.median(days.values())))
+        for key, days in first_ask.items()
+        if len(days) >= PREFETCH_MIN_DAYS
+    ]
+    recurring.sort(key=lambda r: r.days, reverse=True)
+    return recurring
+
+
+def _seconds_until(minute_of_day: int, now: float) -> float:
+    dt = datetime.fromtimestamp(now)
+    current = dt.hour * 3600 + dt.minute * 60 + dt.second
+    return (minute_of_day * 60 - current) % 86400
+
+
+def run_prefetch(now: Optional[float] = None) -> List[str]:
+    """Refresh the recurring questions that are due soon; returns the ones refreshed."""
+    now = now or time.time()
+    refreshed: List[str] = []
+    for rq in mine_recurring(now):
+        if len(refreshed) >= PREFETCH_MAX_PER_RUN:
+            break
+        until = _seconds_until(rq.usual_minute, now)
+        if until > PREFETCH_LEAD_SECONDS:
+            continue
+        ttl = web_search.INTENT_TTL_SECONDS.get(web_search.intent_hint(rq.query), web_search.CACHE_TTL_SECONDS)
+        if ttl < until:
+            # would expire again before it is asked (e.g. crypto prices)
+            continue
+        try:
+            if web_search.prefetch(rq.query, fresh_for=max(0.0, until - PREFETCH_SLACK_SECONDS)):
+                refreshed.append(rq.query)
+        except Exception:
+            continue
+    return refreshed
+
+
+def start_prefetcher(interval: float = PREFETCH_INTERVAL_SECONDS) -> threading.Thread:
+    """Run run_prefetch() every interval seconds on a daemon thread."""
+
+    def _loop():
+        while True:
+            try:
+                run_prefetch()
+            except Exception:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_loop, name="ares-prefetch", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ============================================================
+# ARES provider outcome statistics (learned provider order)
+# - Per (query class, provider): hits, misses and a moving average
+#   of the time a provider takes to answer (or to say "nothing").
+# - expected_cost() = latency / hit probability: sorting a chain by
+#   it minimises the expected time to the first answer.
+# - Counters are kept in memory and flushed to SQLite as deltas every
+#   few records, so several processes can add to the same file.
+#   record() never writes; it says when flush() is due, so an async
+#   caller can run the flush off its event loop.
+# ============================================================
+
+Key = Tuple[str, str]  # (query class, provider)
+
+
+class ProviderStats:
+    def __init__(
+        self,
+        path: str,
+        prior_latency: float = 1.0,
+        latency_alpha: float = 0.2,
+        flush_every: int = 20,
+        flush_interval: float = 60.0,
+    ):
+        self.path = path
+        self.prior_latency = float(prior_latency)
+        self.latency_alpha = float(latency_alpha)
+        self.flush_every = int(flush_every)
+        self.flush_interval = float(flush_interval)
+
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()  # flushes may run on several worker threads
+        # key -> [hits, misses, latency]
+        self._stats: Dict[Key, List[float]] = {}
+        # key -> [hits, misses] not yet written
+        self._pending: Dict[Key, List[int]] = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        self._conn = self._connect()
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS provider_stats ("
+            " query_class TEXT NOT NULL,"
+            " provider TEXT NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0,"
+            " misses INTEGER NOT NULL DEFAULT 0,"
+            " latency REAL NOT NULL,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (query_class, provider))"
+        )
+        return conn
+
+    def _load(self) -> None:
+        rows = self._conn.execute("SELECT query_class, provider, hits, misses, latency FROM provider_stats")
+        with self._lock:
+            for qclass, provider, hits, misses, latency in rows:
+                self._stats[(qclass, provider)] = [hits, misses, latency]
+
+    def record(self, qclass: str, provider: str, hit: bool, latency: float) -> bool:
+        """Count one outcome in memory; True when a flush() is due (left to the caller's thread)."""
+        key = (qclass, provider)
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                s = self._stats[key] = [0, 0, float(latency)]
+            s[0 if hit else 1] += 1
+            s[2] += self.latency_alpha * (float(latency) - s[2])
+
+            p = self._pending.setdefault(key, [0, 0])
+            p[0 if hit else 1] += 1
+            self._pending_count += 1
+            return (
+                self._pending_count >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+    def flush(self) -> None:
+        """Add pending counts to the file and pick up what other processes wrote."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._last_flush = time.monotonic()
+            latencies = {k: self._stats[k][2] for k in pending}
+        if not pending:
+            return
+        now = time.time()
+        try:
+            with self._db_lock:
+                self._conn.executemany(
+                    "INSERT INTO provider_stats (query_class, provider, hits, misses, latency, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (query_class, provider) DO UPDATE SET"
+                    " hits = hits + excluded.hits, misses = misses + excluded.misses,"
+                    " latency = excluded.latency, updated = excluded.updated",
+                    [(q, p, h, m, latencies[(q, p)], now) for (q, p), (h, m) in pending.items()],
+                )
+                self._load()
+        except sqlite3.Error:
+            pass
+
+    def hit_rate(self, qclass: str, provider: str) -> float:
+        """Hit probability with a uniform prior (0.5 with no data)."""
+        with self._lock:
+            s = self._stats.get((qclass, provider))
+        hits, misses = (s[0], s[1]) if s else (0, 0)
+        return (hits + 1.0) / (hits + misses + 2.0)
+
+    def samples(self, qclass: str, provider: str) -> int:
+        with self._lock:
+            s = self._stats.get((qclass, provider))
+        return int(s[0] + s[1]) if s else 0
+
+    def latency(self, qclass: str, provider: str) -> float:
+        with self._lock:
+            s = self._stats.get((qclass, provider))
+        return s[2] if s else self.prior_latency
+
+    def expected_cost(self, qclass: str, provider: str) -> float:
+        return self.latency(qclass, provider) / self.hit_rate(qclass, provider)
+
+    def order(self, qclass: str, providers: Iterable[str]) -> List[str]:
+        """Cheapest expected time-to-answer first; ties keep the given order."""
+        return sorted(providers, key=lambda p: self.expected_cost(qclass, p))
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+        with self._lock:
+            items = list(self._stats.items())
+        out: Dict[str, Dict[str, Dict[str, Optional[float]]]] = {}
+        for (qclass, provider), (hits, misses, latency) in items:
+            out.setdefault(qclass, {})[provider] = {
+                "hits": hits,
+                "misses": misses,
+                "latency": latency,
+                "hit_rate": (hits + 1.0) / (hits + misses + 2.0),
+            }
+        return out
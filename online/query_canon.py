@@ -0,0 +1,139 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from online.geocode_index import normalize_place
+from utils.intent_router import route
+
+# ============================================================
+# ARES query canonicalization (cache keys)
+# - Questions that need the same upstream answer get the same key:
+#   "weather in Berlin tomorrow", "tomorrow weather berlin" and
+#   "whats the weather in berlin" -> "weather:berlin".
+# - Slot intents: weather (location), currency (amount + pair),
+#   crypto (coin). The providers read their slots from here too,
+#   so key and request can never disagree.
+# - Everything else is keyed by its topic: the words left after
+#   dropping conversational filler, in their original order.
+# ============================================================
+
+# words that carry no topic ("tell me about", "what is the", ...)
+FILLER_WORDS = frozenset((
+    "what", "whats", "who", "whos", "is", "are", "was", "were", "the", "a", "an",
+    "please", "tell", "me", "about", "can", "could", "would", "you", "do", "does",
+    "know", "search", "look", "up", "find", "hey", "hi", "ares", "explain", "give",
+    "show", "some", "info", "i", "want", "to", "of",
+))
+
+# weather questions: everything that is not the place
+WEATHER_WORDS = frozenset((
+    "weather", "wheather", "wheater", "forecast", "temperature", "temp", "meteo",
+    "how", "hot", "cold", "warm", "rain", "raining", "rainy", "sunny", "snow", "snowing",
+    "will", "it", "be", "going", "like", "outside", "current", "currently", "in", "at", "for",
+))
+WHEN_WORDS = frozenset((
+    "today", "tomorrow", "tomorrows", "tonight", "now", "this", "next", "coming", "day", "days",
+    "week", "weekend", "morning", "afternoon", "evening", "night", "later", "right", "soon",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+))
+ARTICLES = frozenset(("the", "a", "an"))
+# never the end of a place name: "berlin on saturday", "at the weekend"
+TRAILING_WORDS = WHEN_WORDS | ARTICLES | frozenset(("on", "over", "during", "by", "until"))
+
+# coin keyword -> CoinGecko id (first match in this order wins)
+COINS: Dict[str, str] = {
+    "bitcoin": "bitcoin",
+    "btc": "bitcoin",
+    "ethereum": "ethereum",
+    "eth": "ethereum",
+    "solana": "solana",
+    "sol": "solana",
+    "dogecoin": "dogecoin",
+    "doge": "dogecoin",
+}
+
+_TOKEN = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+
+class CanonicalQuery(NamedTuple):
+    intent: str                  # "weather" | "currency" | "crypto" | "topic"
+    slots: Tuple[str, ...]
+    key: str
+
+
+def _words(q: str) -> List[str]:
+    text = (q or "").lower().replace("’", "'").replace("'", "")
+    return _TOKEN.findall(text)
+
+
+def extract_location(q: str) -> str:
+    """
+    Place named in a weather question, as typed: the words after the last
+    "in/at/for" minus trailing time words and articles ("at the weekend" names
+    no place), else whatever is not weather talk.
+    """
+    tokens = re.findall(r"[\w\-']+", q or "")
+    lower = [t.lower() for t in tokens]
+
+    preps = [i for i, t in enumerate(lower) if t in ("in", "at", "for")]
+    if preps:
+        tail = list(range(preps[-1] + 1, len(tokens)))
+        while tail and lower[tail[-1]] in TRAILING_WORDS:
+            tail.pop()
+        if tail:
+            return " ".join(tokens[i] for i in tail)
+
+    skip = FILLER_WORDS | WEATHER_WORDS | TRAILING_WORDS
+    return " ".join(t for t, low in zip(tokens, lower) if low.replace("'", "") not in skip)
+
+
+def parse_currency(q: str) -> Optional[Tuple[float, str, str]]:
+    """'convert 100 usd to eur' -> (100.0, 'USD', 'EUR'); no amount means 1."""
+    ql = (q or "").lower()
+    m = re.search(r"\b([0-9]+(\.[0-9]+)?)\s*([a-z]{3})\s*(to|in)\s*([a-z]{3})\b", ql)
+    if m:
+        return float(m.group(1)), m.group(3).upper(), m.group(5).upper()
+    m = re.search(r"\b([a-z]{3})\s*(to|in)\s*([a-z]{3})\b", ql)
+    if m:
+        return 1.0, m.group(1).upper(), m.group(3).upper()
+    return None
+
+
+def find_coin(q: str) -> Optional[str]:
+    """CoinGecko id of the first coin mentioned, if any."""
+    ql = (q or "").lower()
+    for word, coin in COINS.items():
+        if re.search(rf"\b{word}\b", ql):
+            return coin
+    return None
+
+
+def topic_of(q: str) -> str:
+    """'What's the capital of France?' -> 'capital france'"""
+    words = _words(q)
+    topic = [w for w in words if w not in FILLER_WORDS]
+    return " ".join(topic or words)
+
+
+@lru_cache(maxsize=1024)
+def canonical_query(q: str) -> CanonicalQuery:
+    """
+    Intent + slots in the order the provider chain tries them; a slot intent
+    whose slots cannot be read falls through, like the chain does.
+    """
+    intents = route(q)
+    if "weather" in intents:
+        place = normalize_place(extract_location(q))
+        if place:
+            return CanonicalQuery("weather", (place,), f"weather:{place}")
+    if "currency" in intents:
+        pair = parse_currency(q)
+        if pair:
+            amount, base, quote = pair
+            return CanonicalQuery("currency", (f"{amount:g}", base, quote), f"currency:{amount:g} {base} {quote}")
+    if "crypto" in intents:
+        coin = find_coin(q)
+        if coin:
+            return CanonicalQuery("crypto", (coin,), f"crypto:{coin}")
+    topic = topic_of(q)
+    return CanonicalQuery("topic", (topic,), f"q:{topic}")
@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Dict, Optional
+
+# ============================================================
+# ARES request scheduler (token buckets)
+# - One bucket per host (refill = 1 / min interval, small burst).
+# - One global bucket on top, so the Pi never floods the uplink.
+# - Host and global waits overlap: a reservation waits for the later
+#   of the two, not their sum.
+# - Callers can ask for the expected wait first and pick another
+#   provider instead of sleeping.
+# ============================================================
+
+
+class TokenBucket:
+    """
+    Classic token bucket that may go into debt: a reservation taken
+    while empty is honoured later, and the debt pushes back the next one.
+    Not thread-safe on its own; HostScheduler serializes access.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(1e-6, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+
+class HostScheduler:
+    """
+    Thread-safe per-host + global request budget.
+
+    host_intervals maps a host (or a parent domain such as "wikipedia.org")
+    to the minimum average spacing between requests to it.
+    """
+
+    def __init__(
+        self,
+        host_intervals: Dict[str, float],
+        default_interval: float = 1.0,
+        host_burst: float = 2.0,
+        global_rate: float = 4.0,
+        global_burst: float = 6.0,
+    ):
+        self.host_intervals = dict(host_intervals)
+        self.default_interval = float(default_interval)
+        self.host_burst = float(host_burst)
+
+        self._global = TokenBucket(global_rate, global_burst)
+        self._hosts: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _key_for(self, host: str) -> str:
+        # "en.wikipedia.org" shares the "wikipedia.org" budget
+        host = host.lower()
+        parts = host.split(".")
+        for i in range(len(parts) - 1):
+            candidate = ".".join(parts[i:])
+            if candidate in self.host_intervals:
+                return candidate
+        return host
+
+    def _bucket_locked(self, host: str) -> TokenBucket:
+        key = self._key_for(host)
+        bucket = self._hosts.get(key)
+        if bucket is None:
+            interval = self.host_intervals.get(key, self.default_interval)
+            bucket = TokenBucket(1.0 / max(1e-3, interval), self.host_burst)
+            self._hosts[key] = bucket
+        return bucket
+
+    def expected_wait(self, host: str) -> float:
+        """How long a request to host would wait right now (nothing is reserved)."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket_locked(host)
+            return max(bucket.wait_time(now), self._global.wait_time(now))
+
+    def reserve(self, host: str, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve a send slot for host and return how long to wait before sending.
+        If the wait would exceed max_wait, nothing is reserved and None is returned.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket_locked(host)
+            wait = max(bucket.wait_time(now), self._global.wait_time(now))
+            if max_wait is not None and wait > max_wait:
+                return None
+            bucket.take()
+            self._global.take()
+            return wait
+
+    def acquire(self, host: str, max_wait: Optional[float] = None) -> bool:
+        """Blocking variant of reserve(): sleeps until the slot, False if skipped."""
+        wait = self.reserve(host, max_wait=max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
@@ -0,0 +1,234 @@
+import base64
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from online.http_pool import HttpResult, network_get
+
+# ============================================================
+# ARES HTTP record / replay (offline benchmarks and regression runs)
+# - Recorder: transport for http_pool.set_transport() that goes to
+#   the real network and appends every good response to a cassette
+#   (JSONL: one request key + status + headers + body per line).
+# - ReplayServer: local stand-in for all the provider hosts. Serves
+#   the cassette over real HTTP (so pooling, gzip and streaming are
+#   exercised too), with configurable latency, errors and 429s.
+# - request_key(): host + path + sorted query, shared by both sides.
+# ============================================================
+
+# response headers worth keeping in a cassette
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def request_key(url: str, params: Optional[dict] = None) -> str:
+    """'https://wttr.in/Cluj Napoca', {'format': 'j1'} -> 'wttr.in/Cluj Napoca?format=j1'"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(k), str(v)) for k, v in (params or {}).items()]
+    path = urllib.parse.unquote(parts.path)
+    return f"{parts.netloc.lower()}{path}?{urllib.parse.urlencode(sorted(query))}"
+
+
+def _apply_parser(resp: HttpResult, parser) -> HttpResult:
+    # what aget(parser=...) would have returned for this body
+    if parser is None or resp.status >= 300:
+        return resp
+    p = parser()
+    if not p.feed(resp.body):
+        p.close()
+    return HttpResult(resp.status, resp.headers, b"", parsed=p.result)
+
+
+class Cassette:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._records[rec["key"]] = rec
+                    except (ValueError, KeyError):
+                        continue
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._records.get(key)
+
+    @staticmethod
+    def body_of(rec: Dict[str, Any]) -> bytes:
+        if "b64" in rec:
+            return base64.b64decode(rec["b64"])
+        return rec.get("text", "").encode("utf-8")
+
+    def add(self, key: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        rec: Dict[str, Any] = {
+            "key": key,
+            "status": int(status),
+            "headers": {h: headers[h] for h in KEPT_HEADERS if h in headers},
+        }
+        try:
+            rec["text"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            rec["b64"] = base64.b64encode(body).decode("ascii")
+
+        with self._lock:
+            self._records[key] = rec
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class Recorder:
+    """Transport: real network, every non-transient response saved to the cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.calls = 0
+
+    async def __call__(self, url, params, headers, timeout, parser) -> HttpResult:
+        self.calls += 1
+        # always read the full body so the cassette can serve any parser later
+        resp = await network_get(url, params, headers, timeout)
+        if resp.status != 429 and resp.status < 500:
+            self.cassette.add(request_key(url, params), resp.status, resp.headers, resp.body)
+        return _apply_parser(resp, parser)
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    replay: "ReplayServer"
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        key = f"{urllib.parse.unquote(parts.path)[1:]}?{urllib.parse.urlencode(sorted(query))}"
+        status, headers, body = self.replay.respond(key)
+
+        if body and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # client stopped reading (streamed parser was done)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass  # client dropped a keep-alive connection (cancelled fan-out task)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer:
+    """
+    Local HTTP stand-in for the provider hosts, fed from a Cassette.
+      latency / jitter: seconds added to every response (latency + U(0, jitter))
+      error_rate: share of requests answered 503
+      rate_429: share of requests answered 429 (Retry-After: 1)
+    Unrecorded requests get 404, like a provider with no result.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.cassette = cassette
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error_rate = float(error_rate)
+        self.rate_429 = float(rate_429)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+        self.requests = 0
+        self.misses = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def respond(self, key: str):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0.0, self.jitter)
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll < self.rate_429:
+            with self._lock:
+                self.throttled += 1
+            return 429, {"Retry-After": "1"}, b""
+        if roll < self.rate_429 + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 503, {}, b""
+
+        rec = self.cassette.get(key)
+        if rec is None:
+            with self._lock:
+                self.misses += 1
+            return 404, {"Content-Type": "application/json"}, b'{"error": "not recorded"}'
+        return rec["status"], dict(rec.get("headers") or {}), Cassette.body_of(rec)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        handler = type("ReplayHandler", (_ReplayHandler,), {"replay": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="ares-replay", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def transport(self) -> Callable[..., Any]:
+        """Transport for http_pool.set_transport(): every host is served by this server."""
+
+        async def _replay(url, params, headers, timeout, parser) -> HttpResult:
+            parts = urllib.parse.urlsplit(url)
+            local = f"{self.base_url}/{parts.netloc.lower()}{urllib.parse.quote(urllib.parse.unquote(parts.path))}"
+            if parts.query:
+                local += "?" + parts.query
+            return await network_get(local, params, headers, timeout, parser)
+
+        return _replay
@@ -0,0 +1,84 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ============================================================
+# Single-flight: concurrent callers asking for the same key share
+# one in-flight call instead of each doing the work.
+# Works across threads and event loops in one process (the shared
+# result is a concurrent.futures.Future). Cross-process coalescing
+# is done on top of this with leases in the cache store.
+# ============================================================
+
+
+class _Abandoned(Exception):
+    """The leader was cancelled; a waiting follower should take over."""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        accept: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """
+        Run fn() once per key at a time; callers arriving meanwhile await its result.
+        If a follower gets a result that accept() rejects (e.g. None from a
+        background fetch that gave up early), it runs fn() itself.
+        """
+        while True:
+            with self._lock:
+                fut = self._calls.get(key)
+                leader = fut is None
+                if leader:
+                    fut = concurrent.futures.Future()
+                    # RUNNING futures cannot be cancelled by a follower's wrapper
+                    fut.set_running_or_notify_cancel()
+                    self._calls[key] = fut
+                    self.leaders += 1
+                else:
+                    self.shared += 1
+
+            if leader:
+                return await self._lead(key, fut, fn)
+
+            try:
+                result = await asyncio.shield(asyncio.wrap_future(fut))
+            except _Abandoned:
+                continue
+            if accept is not None and not accept(result):
+                return await fn()
+            return result
+
+    async def _lead(self, key: str, fut: concurrent.futures.Future, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key)
+            fut.set_exception(_Abandoned())
+            raise
+        except Exception as exc:
+            self._finish(key)
+            fut.set_exception(exc)
+            raise
+        self._finish(key)
+        fut.set_result(result)
+        return result
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
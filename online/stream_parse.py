@@ -0,0 +1,180 @@
+import codecs
+import json
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Optional
+
+# ============================================================
+# ARES incremental response parsers
+# - Fed the body chunk by chunk while it downloads (already
+#   gzip-decoded by the HTTP client); feed() returns True once the
+#   record we want has been seen, so the caller stops reading.
+# - AtomFirstEntry: first <entry> of an Atom feed (arXiv).
+# - JsonFirstItem: first element of the array at a key path, e.g.
+#   ("message", "items") for Crossref, ("items",) for StackExchange.
+# ============================================================
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+
+class StreamParser:
+    """Interface used by http_pool.aget(parser=...)."""
+
+    result: Any = None
+
+    def feed(self, chunk: bytes) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """End of body reached without feed() returning True."""
+
+
+class AtomFirstEntry(StreamParser):
+    """result = {"title": ..., "id": ..., "summary": ..., ...} of the first entry."""
+
+    def __init__(self):
+        self.result: Optional[Dict[str, str]] = None
+        self._parser = ET.XMLPullParser(events=("end",))
+        self._done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self._done:
+            return True
+        try:
+            self._parser.feed(chunk)
+            for _event, elem in self._parser.read_events():
+                if elem.tag != ATOM_NS + "entry":
+                    continue
+                fields: Dict[str, str] = {}
+                for child in elem:
+                    name = child.tag.rsplit("}", 1)[-1]
+                    text = re.sub(r"\s+", " ", child.text or "").strip()
+                    if text and name not in fields:
+                        fields[name] = text
+                self.result = fields
+                self._done = True
+                break
+        except ET.ParseError:
+            # not (well-formed) XML: nothing more to get from this body
+            self._done = True
+        return self._done
+
+
+_JSON_TOKEN = re.compile(r'[{}\[\],"]')
+_JSON_STRING_END = re.compile(r'["\\]')
+# what may follow a complete scalar item; anything else may be more of it
+_SCALAR_END = frozenset(",] \t\r\n")
+
+
+class JsonFirstItem(StreamParser):
+    """
+    result = first element of the array found at path (None if the array is
+    empty or the path is missing). Only the prefix up to the end of that
+    element is ever scanned or decoded.
+    """
+
+    def __init__(self, *path: str):
+        self.path = list(path)
+        self.result: Any = None
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._stack = []          # per open container: [is_object, current key]
+        self._expect_key = False
+        self._in_string = False
+        self._string_start = 0
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self._done:
+            return True
+        self._buf += self._text.decode(chunk)
+        if self._item_start is None:
+            self._scan()
+        if self._item_start is not None:
+            self._decode_item(final=False)
+        return self._done
+
+    def close(self) -> None:
+        if not self._done and self._item_start is not None:
+            self._decode_item(final=True)
+        self._done = True
+
+    def _at_path(self) -> bool:
+        if len(self._stack) != len(self.path):
+            return False
+        return all(is_obj and key == want for (is_obj, key), want in zip(self._stack, self.path))
+
+    def _scan(self) -> None:
+        buf, pos = self._buf, self._pos
+        while True:
+            if self._in_string:
+                m = _JSON_STRING_END.search(buf, pos)
+                if not m:
+                    pos = len(buf)
+                    break
+                if m.group() == "\\":
+                    if m.end() >= len(buf):
+                        pos = m.start()  # escaped char not here yet
+                        break
+                    pos = m.end() + 1
+                    continue
+                self._in_string = False
+                pos = m.end()
+                if self._expect_key:
+                    self._stack[-1][1] = json.loads(buf[self._string_start:pos])
+                    self._expect_key = False
+                continue
+
+            m = _JSON_TOKEN.search(buf, pos)
+            if not m:
+                pos = len(buf)
+                break
+            ch, pos = m.group(), m.end()
+            if ch == '"':
+                self._in_string = True
+                self._string_start = m.start()
+            elif ch == "{":
+                self._stack.append([True, None])
+                self._expect_key = True
+            elif ch == "[":
+                if self._at_path():
+                    self._item_start = pos
+                    break
+                self._stack.append([False, None])
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._expect_key = False
+            elif ch == ",":
+                self._expect_key = bool(self._stack) and self._stack[-1][0]
+
+        # drop what has been scanned; keep an unfinished string or the item
+        cut = self._string_start if self._in_string else pos
+        if self._item_start is not None:
+            cut = self._item_start
+        self._buf = buf[cut:]
+        self._pos = pos - cut
+        self._string_start -= cut if self._in_string else 0
+        if self._item_start is not None:
+            self._item_start = 0
+
+    def _decode_item(self, final: bool) -> None:
+        text = self._buf[self._item_start:].lstrip()
+        if not text:
+            self._done = final
+            return
+        if text[0] == "]":
+            self._done = True
+            return
+        try:
+            value, end = self._json.raw_decode(text)
+        except ValueError:
+            self._done = final  # incomplete: wait for the next chunk
+            return
+        if not final and not isinstance(value, (dict, list, str)) and (end == len(text) or text[end] not in _SCALAR_END):
+            return  # a number may continue in the next chunk ("-2." + "5")
+        self.result = value
+        self._done = True
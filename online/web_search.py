@@ -1,30 +1,101 @@
+import asyncio
+import contextvars
+import functools
 import json
 import os
+import random
 import re
 import time
-import math
-from dataclasses import dataclass
+import threading
+import uuid
+from dataclasses import asdict, dataclass
 from typing import Any, Dict, Optional, Tuple, List
 
-import requests
+from online.background_loop import on_shutdown, run_sync
+from online.cache_store import AnswerCache, CacheEntry, MemoryTier, TieredCache
+from online.fuzzy_index import NgramIndex
+from online.geocode_index import GeocodeIndex
+from online.host_health import HostHealth
+from online.http_pool import aclose, aget
+from online.provider_stats import ProviderStats
+from online.query_canon import COINS, canonical_query, extract_location, find_coin, parse_currency, topic_of
+from online.rate_limit import HostScheduler
+from online.singleflight import SingleFlight
+from online.stream_parse import AtomFirstEntry, JsonFirstItem
+from utils.intent_router import KEYWORDS as INTENT_KEYWORDS
+from utils.intent_router import route as route_intents
+from network.providers.wikipedia_offline import DEFAULT_INDEX_PATH as WIKI_OFFLINE_INDEX_PATH
+from network.providers.wikipedia_offline import OfflineWikipediaProvider
 
 # ============================================================
 # ARES Online Web Helper (API-first, cache-first)
 # - No scraping of Google pages.
-# - Uses free public APIs (no keys) + Wikipedia.
-# - 1-hour cache to avoid repeating requests.
+# - Uses free public APIs (no keys) + Wikipedia (local abstracts
+#   index first when one has been built, see wikipedia_offline.py).
+# - Two-tier cache (memory + disk) with per-intent TTLs, keyed by
+#   intent + slots (online/query_canon.py); free-text questions also
+#   match near-duplicates already in the cache (online/fuzzy_index.py).
+# - Stale-while-revalidate: expired answers are served at once while
+#   a background task refreshes them; "not found" backs off on its own.
+# - Single-flight: identical in-flight queries (and identical provider
+#   requests) share one fetch, across threads, loops and processes.
+# - One pooled keep-alive session (online/http_pool.py).
+# - Async end to end: providers and asearch_and_summarise() are
+#   coroutines; search_and_summarise() is the blocking wrapper.
+# - search_multi(): every eligible provider at once, ranked candidates
+#   (cached as a set), which also serve "tell me more" / "what else".
 # ============================================================
 
 USER_AGENT = "ARES-assistant/1.0 (+local)"
-CACHE_TTL_SECONDS = 3600  # 1 hour
-CACHE_PATH = os.path.expanduser("~/.ares_web_cache.json")
+CACHE_TTL_SECONDS = 3600  # 1 hour (default when the intent has no entry below)
+CACHE_PATH = os.path.expanduser("~/.ares_web_cache.sqlite3")
+CACHE_MAX_ENTRIES = 5000
+CACHE_PURGE_INTERVAL_SECONDS = 600
+MEMORY_CACHE_MAX_ENTRIES = 256
+# Free-text questions this similar (n-gram Jaccard) to a cached one share its answer
+FUZZY_MATCH_THRESHOLD = 0.8
+# Place name -> coordinates; never expires (online/geocode_index.py)
+GEOCODE_INDEX_PATH = os.path.expanduser("~/.ares_geocode.sqlite3")
+
+# How long an answer stays fresh, by the kind of question that produced it
+INTENT_TTL_SECONDS = {
+    "weather": 30 * 60,        # forecasts move slowly, but do move
+    "currency": 15 * 60,
+    "crypto": 60,              # prices change by the minute
+    "wiki": 7 * 24 * 3600,     # encyclopedia summaries barely change
+    "ddg": 24 * 3600,
+    "tech": 6 * 3600,          # StackExchange / GitHub / HN / books / papers / TV
+}
+
+# After the TTL, how long an answer may still be served (stale) while it is refreshed
+STALE_GRACE_SECONDS = 24 * 3600
+INTENT_STALE_SECONDS = {
+    "weather": 6 * 3600,
+    "currency": 6 * 3600,
+    "crypto": 10 * 60,         # an old price is worse than a short wait
+    "wiki": 30 * 24 * 3600,
+    "ddg": 7 * 24 * 3600,
+    "tech": 7 * 24 * 3600,
+}
 
-# Global request pacing (prevents bursts)
-GLOBAL_MIN_SECONDS_BETWEEN_REQUESTS = 1.2
-_last_request_ts = 0.0
+# Whole rate / price tables behind the currency and crypto answers: one request per
+# table per TTL, every pair and coin computed from it
+RATE_TABLE_BASE = "EUR"                          # pivot table; cross rates divide two of its entries
+RATE_TABLE_TTL_SECONDS = INTENT_TTL_SECONDS["currency"]
+COIN_TABLE_TTL_SECONDS = INTENT_TTL_SECONDS["crypto"]
+COIN_QUOTES = ("usd", "eur")
 
-# Per-host pacing (extra safety)
-_host_last_ts: Dict[str, float] = {}
+# "Nothing found" is retried sooner: TTL per consecutive miss of the same query
+NEGATIVE_TTL_SCHEDULE = (5 * 60, 15 * 60, 3600, 6 * 3600)
+NO_ANSWER_MESSAGE = "I couldn't find a solid answer via free APIs. Try rephrasing the question."
+UNREACHABLE_MESSAGE = "I can't reach my sources right now. Ask me again in a moment."
+
+# Global request budget (prevents bursts across all hosts)
+GLOBAL_REQUESTS_PER_SECOND = 4.0
+GLOBAL_BURST = 6
+
+# Per-host pacing (extra safety): average seconds between requests to one host
+HOST_BURST = 2
 HOST_MIN_SECONDS = {
     "wikipedia.org": 1.0,
     "api.duckduckgo.com": 1.0,
@@ -43,28 +114,130 @@ HOST_MIN_SECONDS = {
     "api.tvmaze.com": 0.8,
 }
 
+_scheduler = HostScheduler(
+    HOST_MIN_SECONDS,
+    default_interval=1.0,
+    host_burst=HOST_BURST,
+    global_rate=GLOBAL_REQUESTS_PER_SECOND,
+    global_burst=GLOBAL_BURST,
+)
+
 DEFAULT_TIMEOUT = 10
+REQUEST_ATTEMPTS = 3  # 1 try + 2 retries; only timeouts, connection errors, 408/429/5xx are retried
+
+# Per-host circuit breaker + latency-based timeouts (online/host_health.py)
+MIN_TIMEOUT = 2.0
+BREAKER_FAILURES = 3             # consecutive timeouts / 5xx before a host is skipped
+BREAKER_COOLDOWN_SECONDS = 30    # first pause; doubles after each failed probe
+BREAKER_MAX_COOLDOWN_SECONDS = 600
+_health = HostHealth(
+    default_timeout=DEFAULT_TIMEOUT,
+    min_timeout=MIN_TIMEOUT,
+    failure_threshold=BREAKER_FAILURES,
+    cooldown=BREAKER_COOLDOWN_SECONDS,
+    max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS,
+)
+
+# Step 6 fallbacks: query them all at once and keep the first answer
+FALLBACK_FANOUT = True
+
+# Background work (prefetch) never queues behind the user for a rate-limit slot
+BACKGROUND_MAX_WAIT = 0.5
+# Default max_wait for every request made in the current context (None = wait as long as needed)
+_max_wait_var: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("ares_max_wait", default=None)
+
+# Latency budget of the current request: absolute time.monotonic() deadline (None = no limit).
+# Set by asearch_and_summarise(deadline=...); every provider and HTTP call below sees it.
+_deadline_var: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("ares_deadline", default=None)
+# extra time the pipeline gets to wind down after the budget, before it is cancelled
+DEADLINE_GRACE_SECONDS = 0.25
+DEADLINE_MESSAGE = "I'm still looking that up. Ask me again in a moment."
+
+# Cross-process single-flight: a process fetching a query holds a lease in the cache file
+LEASE_SECONDS = 30
+LEASE_POLL_SECONDS = 0.2
+_LEASE_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_flights = SingleFlight()
+# _resolve() verdict "the providers answered and none had anything" (a negative entry
+# is stored); None instead means no verdict (requests skipped), and followers retry
+_NOT_FOUND = ""
+
+# Learned provider order (online/provider_stats.py): outcomes per query class,
+# chain sorted by expected time-to-answer, near-useless providers skipped
+PROVIDER_STATS_PATH = os.path.expanduser("~/.ares_provider_stats.sqlite3")
+PROVIDER_EXPLORE_RATE = 0.1        # share of queries that use the default order (and every provider)
+PROVIDER_PRUNE_HIT_RATE = 0.05     # skip a provider whose hit rate for the class is below this ...
+PROVIDER_PRUNE_MIN_SAMPLES = 20    # ... once it has been measured this many times
+# Requests that gave no verdict (breaker open, out of budget, gave up retrying) in the
+# current provider call / query; such calls are not counted as misses, and such a query
+# stores no negative entry
+_skipped_var: "contextvars.ContextVar[tuple]" = contextvars.ContextVar("ares_skipped", default=())
+
+# Ranked candidates (search_multi) and follow-ups
+MULTI_K = 3
+FOLLOWUP_WINDOW_SECONDS = 10 * 60  # "tell me more" refers to a question at most this old
+FOLLOWUP_EXHAUSTED_MESSAGE = "That's everything I found about it."
 
 
 # ----------------------------
 # Cache
 # ----------------------------
-def _load_cache() -> Dict[str, Any]:
-    if not os.path.exists(CACHE_PATH):
-        return {}
-    try:
-        with open(CACHE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+_store: Optional[TieredCache] = None
+_store_lock = threading.Lock()
 
 
-def _save_cache(cache: Dict[str, Any]) -> None:
-    try:
-        with open(CACHE_PATH, "w", encoding="utf-8") as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+def _get_store() -> TieredCache:
+    # opened lazily so importing this module never touches the disk
+    global _store
+    with _store_lock:
+        if _store is None:
+            disk = AnswerCache(
+                CACHE_PATH,
+                max_entries=CACHE_MAX_ENTRIES,
+                purge_interval=CACHE_PURGE_INTERVAL_SECONDS,
+            )
+            _store = TieredCache(disk, MemoryTier(MEMORY_CACHE_MAX_ENTRIES))
+        return _store
+
+
+_geo_index: Optional[GeocodeIndex] = None
+
+
+def _get_geo_index() -> GeocodeIndex:
+    global _geo_index
+    with _store_lock:
+        if _geo_index is None:
+            _geo_index = GeocodeIndex(GEOCODE_INDEX_PATH)
+        return _geo_index
+
+
+_provider_stats: Optional[ProviderStats] = None
+
+
+def _get_provider_stats() -> ProviderStats:
+    global _provider_stats
+    with _store_lock:
+        if _provider_stats is None:
+            _provider_stats = ProviderStats(PROVIDER_STATS_PATH)
+        return _provider_stats
+
+
+_fuzzy: Optional[NgramIndex] = None
+_fuzzy_hits = 0
+
+
+def _get_fuzzy() -> NgramIndex:
+    # seeded from the free-text answers already on disk, then kept up to date by _cache_set.
+    # Built outside _store_lock (the scan reads the whole table) and published under it.
+    global _fuzzy
+    if _fuzzy is not None:
+        return _fuzzy
+    index = NgramIndex(FUZZY_MATCH_THRESHOLD, max_entries=CACHE_MAX_ENTRIES)
+    index.add_many((key, key[2:]) for key in _get_store().disk.keys("q:"))
+    with _store_lock:
+        if _fuzzy is None:
+            _fuzzy = index
+        return _fuzzy
 
 
 def _normalize_query(q: str) -> str:
@@ -73,122 +246,358 @@ def _normalize_query(q: str) -> str:
     return q
 
 
-def _cache_get(q: str) -> Optional[str]:
-    cache = _load_cache()
-    key = _normalize_query(q)
-    item = cache.get(key)
-    if not item:
+def _cache_key(q: str) -> str:
+    """Intent + slots ("weather:berlin", "currency:100 USD EUR"), or "q:" + topic words."""
+    return canonical_query(_normalize_query(q)).key
+
+
+async def _acache_lookup(q: str) -> Optional[CacheEntry]:
+    """_cache_lookup() off the event loop; only a fresh memory-tier hit is answered inline."""
+    if _store is not None:
+        entry = _store.peek(_cache_key(q))
+        if entry is not None:
+            return entry
+    return await asyncio.to_thread(_cache_lookup, q)
+
+
+def _cache_lookup(q: str) -> Optional[CacheEntry]:
+    # fresh or stale-but-servable entry; free text falls back to the closest cached question
+    global _fuzzy_hits
+    key = _cache_key(q)
+    try:
+        entry = _get_store().lookup(key)
+        if entry is not None or not key.startswith("q:"):
+            return entry
+        fuzzy = _get_fuzzy()
+        match = fuzzy.best(key[2:])
+        if match is None:
+            return None
+        entry = _get_store().lookup(match[0])
+        if entry is None or entry.negative:
+            fuzzy.remove(match[0])
+            return None
+        _fuzzy_hits += 1
+        return entry
+    except Exception:
         return None
-    ts = item.get("ts", 0)
-    if time.time() - ts > CACHE_TTL_SECONDS:
-        # expired
-        cache.pop(key, None)
-        _save_cache(cache)
+
+
+def _cache_set(q: str, answer: str, intent: Optional[str] = None) -> None:
+    ttl = INTENT_TTL_SECONDS.get(intent, CACHE_TTL_SECONDS)
+    stale = INTENT_STALE_SECONDS.get(intent, STALE_GRACE_SECONDS)
+    key = _cache_key(q)
+    try:
+        _get_store().set(key, answer, ttl, stale)
+        if key.startswith("q:"):
+            _get_fuzzy().add(key, key[2:])
+    except Exception:
+        pass
+
+
+def _cache_set_negative(q: str, answer: str) -> None:
+    # a stale real answer keeps being served until its window ends; a miss does not replace it
+    key = _cache_key(q)
+    try:
+        store = _get_store()
+        entry = store.disk.get_entry(key, allow_stale=True)
+        if entry is None or entry.negative:
+            store.set_negative(key, answer, NEGATIVE_TTL_SCHEDULE)
+    except Exception:
+        pass
+
+
+def _table_get(name: str) -> Optional[Dict[str, Any]]:
+    # provider tables share the answer store (and so both processes), under a "table:" key
+    try:
+        entry = _get_store().lookup("table:" + name, allow_stale=False)
+        return json.loads(entry.answer) if entry is not None and not entry.negative else None
+    except Exception:
         return None
-    return item.get("answer")
 
 
-def _cache_set(q: str, answer: str) -> None:
-    cache = _load_cache()
-    key = _normalize_query(q)
-    cache[key] = {"ts": time.time(), "answer": answer}
-    _save_cache(cache)
+def _table_set(name: str, table: Dict[str, Any], ttl: float) -> None:
+    try:
+        _get_store().set("table:" + name, json.dumps(table), ttl)
+    except Exception:
+        pass
+
+
+async def _astore() -> TieredCache:
+    # the first open creates the file and tables: do it off the loop
+    if _store is not None:
+        return _store
+    return await asyncio.to_thread(_get_store)
+
+
+async def _record_query(q: str) -> None:
+    # buffered in memory by the store, so only opening it can block
+    try:
+        (await _astore()).disk.record_query(_normalize_query(q))
+    except Exception:
+        pass
+
+
+def query_history(since: float) -> List[Tuple[str, float]]:
+    """(normalized query, timestamp) for questions asked since the given time."""
+    try:
+        return _get_store().disk.query_history(since)
+    except Exception:
+        return []
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the memory and disk cache tiers, plus coalesced fetches."""
+    try:
+        stats = _get_store().stats()
+    except Exception:
+        stats = {}
+    stats["fuzzy"] = {"hits": _fuzzy_hits, "size": len(_fuzzy) if _fuzzy is not None else 0}
+    stats["singleflight"] = {"leaders": _flights.leaders, "shared": _flights.shared}
+    return stats
+
+
+def provider_stats() -> Dict[str, Any]:
+    """Hits, misses, latency and hit rate per query class and provider."""
+    try:
+        return _get_provider_stats().snapshot()
+    except Exception:
+        return {}
+
+
+def host_stats() -> Dict[str, Dict[str, Any]]:
+    """Breaker state, failure streak, median latency and current timeout per host."""
+    return _health.stats()
 
 
 # ----------------------------
 # HTTP helpers (rate limiting + backoff)
 # ----------------------------
-def _sleep_if_needed(host: str) -> None:
-    global _last_request_ts
+def _host_of(url: str) -> str:
+    return re.sub(r"^https?://", "", url).split("/")[0]
 
-    now = time.time()
-    # global pacing
-    dt_global = now - _last_request_ts
-    if dt_global < GLOBAL_MIN_SECONDS_BETWEEN_REQUESTS:
-        time.sleep(GLOBAL_MIN_SECONDS_BETWEEN_REQUESTS - dt_global)
 
-    # host pacing
-    min_host = HOST_MIN_SECONDS.get(host, 1.0)
-    last = _host_last_ts.get(host, 0.0)
-    dt_host = now - last
-    if dt_host < min_host:
-        time.sleep(min_host - dt_host)
+def expected_wait(url_or_host: str) -> float:
+    """Seconds a request to this host would have to wait for its rate-limit slot."""
+    return _scheduler.expected_wait(_host_of(url_or_host))
 
 
-def _request_json(url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Optional[dict]:
-    host = re.sub(r"^https?://", "", url).split("/")[0]
-    _sleep_if_needed(host)
+async def _sleep_if_needed(host: str, max_wait: Optional[float] = None) -> bool:
+    # reserve a slot in the host + global buckets; False = would wait too long
+    wait = _scheduler.reserve(host, max_wait=max_wait)
+    if wait is None:
+        return False
+    if wait > 0:
+        await asyncio.sleep(wait)
+    return True
 
-    h = {"User-Agent": USER_AGENT, "Accept": "application/json"}
-    if headers:
-        h.update(headers)
 
-    # small backoff retries for transient errors
-    for attempt in range(3):
-        try:
-            resp = requests.get(url, params=params, headers=h, timeout=DEFAULT_TIMEOUT)
-            global _last_request_ts
-            _last_request_ts = time.time()
-            _host_last_ts[host] = _last_request_ts
+def _request_key(url: str, params: Optional[dict], headers: dict, parser=None) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    key = f"http:{headers.get('Accept', '')} {url}?{query}"
+    return key if parser is None else f"{key} parse:{parser!r}"
 
-            if resp.status_code in (429, 503, 502, 500):
-                time.sleep((attempt + 1) * 1.5)
-                continue
 
-            resp.raise_for_status()
-            return resp.json()
+async def _request(url: str, params: Optional[dict], headers: dict, max_wait: Optional[float], parser=None):
+    # identical requests already in flight (same URL + params) share one response
+    return await _flights.do(
+        _request_key(url, params, headers, parser),
+        lambda: _request_once(url, params, headers, max_wait, parser),
+        accept=lambda resp: resp is not None,
+    )
+
+
+async def _request_once(
+    url: str,
+    params: Optional[dict],
+    headers: dict,
+    max_wait: Optional[float],
+    parser=None,
+):
+    host = _host_of(url)
+    # known-dead host: answer "nothing" at once instead of waiting on timeouts
+    if not _health.allow(host):
+        _note_skip()
+        return None
+    try:
+        resp = await _request_attempts(url, params, headers, max_wait, parser, host)
+    finally:
+        _health.release(host)
+    if resp is None:
+        _note_skip()
+    return resp
+
+
+def _note_skip() -> None:
+    for box in _skipped_var.get():
+        box[0] += 1
+
+
+def _remaining() -> Optional[float]:
+    """Seconds left in the current request's budget (None = no deadline)."""
+    deadline = _deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+async def _backoff(seconds: float, host: str) -> bool:
+    # sleep before a retry, unless the budget cannot cover the sleep plus a typical response
+    remaining = _remaining()
+    if remaining is not None and seconds + (_health.latency(host) or 0.0) >= remaining:
+        return False
+    await asyncio.sleep(seconds)
+    return True
+
+
+async def _request_attempts(url, params, headers, max_wait, parser, host: str):
+    if max_wait is None:
+        max_wait = _max_wait_var.get()
+    remaining = _remaining()
+    if remaining is not None:
+        # whatever the host's usual response time leaves over may go to the rate-limit wait
+        budget = remaining - (_health.latency(host) or 0.0)
+        if budget <= 0:
+            return None
+        max_wait = budget if max_wait is None else min(max_wait, budget)
+    if not await _sleep_if_needed(host, max_wait=max_wait):
+        return None
+
+    # small backoff retries, for transient errors only
+    for attempt in range(REQUEST_ATTEMPTS):
+        last = attempt == REQUEST_ATTEMPTS - 1
+        if attempt and not _health.allow(host):
+            return None  # breaker opened meanwhile (other callers saw it fail too)
+        host_timeout = timeout = _health.timeout_for(host)
+        remaining = _remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                return None
+            timeout = min(timeout, remaining)
+        start = time.monotonic()
+        try:
+            resp = await aget(url, params=params, headers=headers, timeout=timeout, parser=parser)
         except Exception:
-            time.sleep((attempt + 1) * 0.8)
+            # timeout / connection error; a timeout shortened by our own budget is not the host's fault
+            cut_short = timeout < host_timeout and time.monotonic() - start >= timeout
+            if not cut_short:
+                _health.record_failure(host)
+            if last or not await _backoff((attempt + 1) * 0.8, host):
+                return None
+            continue
+        elapsed = time.monotonic() - start
+
+        if resp.status == 429:
+            # alive, just busy: not a breaker failure
+            _health.record_success(host, elapsed)
+            retry_after = resp.headers.get("Retry-After") or ""
+            delay = float(retry_after) if retry_after.isdigit() else (attempt + 1) * 1.5
+            if last or delay > BREAKER_COOLDOWN_SECONDS or not await _backoff(delay, host):
+                return None
+            continue
+
+        if resp.status >= 500 or resp.status == 408:
+            _health.record_failure(host)
+            if last or not await _backoff((attempt + 1) * 1.5, host):
+                return None
+            continue
+
+        # success, or a 4xx: the request itself is wrong or has no result and
+        # asking again will not help. Returned as-is so coalesced callers share it.
+        _health.record_success(host, elapsed)
+        return resp
     return None
 
 
-def _request_text(url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Optional[str]:
-    host = re.sub(r"^https?://", "", url).split("/")[0]
-    _sleep_if_needed(host)
+async def _request_json(
+    url: str,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    max_wait: Optional[float] = None,
+) -> Optional[dict]:
+    h = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+    if headers:
+        h.update(headers)
+    resp = await _request(url, params, h, max_wait)
+    if resp is None or resp.status >= 400:
+        return None
+    try:
+        return resp.json()
+    except ValueError:
+        return None
+
 
+async def _request_text(
+    url: str,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    max_wait: Optional[float] = None,
+) -> Optional[str]:
     h = {"User-Agent": USER_AGENT, "Accept": "*/*"}
     if headers:
         h.update(headers)
+    resp = await _request(url, params, h, max_wait)
+    if resp is None or resp.status >= 400:
+        return None
+    return resp.text
 
-    for attempt in range(3):
-        try:
-            resp = requests.get(url, params=params, headers=h, timeout=DEFAULT_TIMEOUT)
-            global _last_request_ts
-            _last_request_ts = time.time()
-            _host_last_ts[host] = _last_request_ts
-
-            if resp.status_code in (429, 503, 502, 500):
-                time.sleep((attempt + 1) * 1.5)
-                continue
 
-            resp.raise_for_status()
-            return resp.text
-        except Exception:
-            time.sleep((attempt + 1) * 0.8)
-    return None
+async def _request_first(
+    url: str,
+    parser,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    max_wait: Optional[float] = None,
+) -> Any:
+    # streamed: reading stops once parser (online/stream_parse.py) has its record
+    h = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+    if headers:
+        h.update(headers)
+    resp = await _request(url, params, h, max_wait, parser)
+    if resp is None or resp.status >= 400:
+        return None
+    return resp.parsed
 
 
 # ----------------------------
 # Query intent detection
 # ----------------------------
+# keyword tables live in utils/intent_router.py (one scan per query, shared with chat/voice)
 def _is_weather_query(q: str) -> bool:
-    ql = q.lower()
-    return any(k in ql for k in ["weather", "temperature", "forecast", "meteo", "how hot", "how cold", "rain", "sunny", "snow"])
+    return "weather" in route_intents(q)
 
 
 def _is_score_query(q: str) -> bool:
-    ql = q.lower()
-    return any(k in ql for k in ["score", "result", "last match", "final score", "vs", "match recap"])
+    return "score" in route_intents(q)
 
 
 def _is_currency_query(q: str) -> bool:
-    ql = q.lower()
-    return any(k in ql for k in ["exchange rate", "convert", "usd to", "eur to", "gbp to", "ron to"])
+    return "currency" in route_intents(q)
 
 
 def _is_crypto_query(q: str) -> bool:
-    ql = q.lower()
-    return any(k in ql for k in ["btc", "bitcoin", "eth", "ethereum", "solana", "doge", "crypto price"])
+    return "crypto" in route_intents(q)
+
+
+def intent_hint(q: str) -> Optional[str]:
+    """Best guess of the cache intent a query will land in, before asking anyone."""
+    if _is_weather_query(q):
+        return "weather"
+    if _is_currency_query(q):
+        return "currency"
+    if _is_crypto_query(q):
+        return "crypto"
+    return None
+
+
+def query_class(q: str) -> str:
+    """Bucket used for provider statistics: the intent, else the shape of the question."""
+    intent = intent_hint(q)
+    if intent:
+        return intent
+    words = _normalize_query(q).split()
+    if words and words[0] in ("who", "what", "when", "where", "why", "how", "which"):
+        return "question"
+    return "entity" if len(words) <= 3 else "phrase"
 
 
 # ----------------------------
@@ -197,22 +606,10 @@ def _is_crypto_query(q: str) -> bool:
 # - wttr.in (simple)
 # - Open-Meteo (reliable forecast, no key)
 # ----------------------------
-def _extract_location_from_query(q: str) -> str:
-    # crude: take last 1-4 words after "in" or end
-    q = q.strip()
-    m = re.search(r"\b(in|at|for)\s+([a-zA-Z\u00C0-\u024F\s\-]+)$", q, re.IGNORECASE)
-    if m:
-        loc = m.group(2).strip()
-        return loc
-    # fallback: last 3 words
-    words = re.sub(r"[^\w\s\-]", " ", q).split()
-    return " ".join(words[-3:]) if len(words) >= 2 else q
-
-
-def _weather_wttr(location: str) -> Optional[str]:
+async def _weather_wttr(location: str) -> Optional[str]:
     # wttr.in supports JSON with ?format=j1
     url = f"https://wttr.in/{location}"
-    data = _request_json(url, params={"format": "j1"})
+    data = await _request_json(url, params={"format": "j1"})
     if not data:
         return None
     try:
@@ -233,25 +630,37 @@ def _weather_wttr(location: str) -> Optional[str]:
         return None
 
 
-def _open_meteo_geocode(location: str) -> Optional[Tuple[float, float, str]]:
+async def _open_meteo_geocode(location: str) -> Optional[Tuple[float, float, str]]:
+    try:
+        known = await asyncio.to_thread(lambda: _get_geo_index().lookup(location))
+    except Exception:
+        known = None
+    if known:
+        return known
+
     url = "https://geocoding-api.open-meteo.com/v1/search"
-    js = _request_json(url, params={"name": location, "count": 1, "language": "en", "format": "json"})
+    js = await _request_json(url, params={"name": location, "count": 1, "language": "en", "format": "json"})
     if not js or "results" not in js or not js["results"]:
         return None
     r = js["results"][0]
     lat = float(r["latitude"])
     lon = float(r["longitude"])
     name = f'{r.get("name","")}, {r.get("country","")}'.strip().strip(",")
+    try:
+        # also file it under the geocoder's own spelling ("Bucharest" for "bucuresti")
+        await asyncio.to_thread(lambda: _get_geo_index().add(location, lat, lon, name, aliases=[r.get("name", "")]))
+    except Exception:
+        pass
     return lat, lon, name
 
 
-def _weather_open_meteo(location: str) -> Optional[str]:
-    geo = _open_meteo_geocode(location)
+async def _weather_open_meteo(location: str) -> Optional[str]:
+    geo = await _open_meteo_geocode(location)
     if not geo:
         return None
     lat, lon, nice = geo
     url = "https://api.open-meteo.com/v1/forecast"
-    js = _request_json(url, params={
+    js = await _request_json(url, params={
         "latitude": lat,
         "longitude": lon,
         "daily": "temperature_2m_max,temperature_2m_min,precipitation_probability_max,weathercode",
@@ -297,54 +706,89 @@ def _weather_open_meteo(location: str) -> Optional[str]:
         return None
 
 
-def _answer_weather(query: str) -> Optional[str]:
-    loc = _extract_location_from_query(query)
+async def _answer_weather(query: str) -> Optional[str]:
+    loc = extract_location(query)
+    if not loc:
+        return None
     # Prefer Open-Meteo (stable), fallback to wttr
-    ans = _weather_open_meteo(loc)
+    ans = await _weather_open_meteo(loc)
     if ans:
         return ans
-    return _weather_wttr(loc)
+    return await _weather_wttr(loc)
 
 
 # ----------------------------
 # Wikipedia (best general fallback)
 # ----------------------------
-def _wiki_summary(query: str) -> Optional[str]:
-    # Wikipedia REST summary endpoint (no key)
-    # First search, then summary.
-    search = _request_json(
-        "https://en.wikipedia.org/w/rest.php/v1/search/title",
-        params={"q": query, "limit": 1},
+_offline_wiki = OfflineWikipediaProvider(WIKI_OFFLINE_INDEX_PATH)
+
+
+def _short_extract(title: str, extract: str) -> str:
+    # keep it short and useful
+    extract = re.sub(r"\s+", " ", extract).strip()
+    if len(extract) > 420:
+        extract = extract[:420].rsplit(" ", 1)[0] + "..."
+    return f"{title}: {extract}"
+
+
+def _offline_wiki_summary(query: str) -> Optional[str]:
+    if not _offline_wiki.available():
+        return None
+    try:
+        hits = _offline_wiki.search(query, limit=1)
+        if not hits:
+            return None
+        page = _offline_wiki.summary(hits[0]["title"])
+    except Exception:
+        return None
+    if not page.get("extract"):
+        return None
+    return _short_extract(page["title"], page["extract"])
+
+
+async def _wiki_summary(query: str) -> Optional[str]:
+    # local abstracts index: no network, no rate limit
+    ans = await asyncio.to_thread(_offline_wiki_summary, query)
+    if ans:
+        return ans
+
+    # MediaWiki search + intro extract of the top hit in one call (no key)
+    js = await _request_json(
+        "https://en.wikipedia.org/w/api.php",
+        params={
+            "action": "query",
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": 1,
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+        },
         headers={"Accept": "application/json"}
     )
-    if not search or not search.get("pages"):
+    pages = ((js or {}).get("query") or {}).get("pages") or []
+    if not pages:
         return None
-    title = search["pages"][0].get("title")
+    summ = pages[0]
+    title = summ.get("title")
     if not title:
         return None
 
-    # Summary
-    url = "https://en.wikipedia.org/api/rest_v1/page/summary/" + requests.utils.quote(title)
-    summ = _request_json(url, headers={"Accept": "application/json"})
-    if not summ:
-        return None
-
     extract = summ.get("extract")
     if not extract:
         return None
 
-    # keep it short and useful
-    extract = re.sub(r"\s+", " ", extract).strip()
-    if len(extract) > 420:
-        extract = extract[:420].rsplit(" ", 1)[0] + "..."
-    return f"{title}: {extract}"
+    return _short_extract(title, extract)
 
 
 # ----------------------------
 # DuckDuckGo Instant Answer (no key)
 # ----------------------------
-def _ddg_instant_answer(query: str) -> Optional[str]:
-    js = _request_json("https://api.duckduckgo.com/", params={
+async def _ddg_instant_answer(query: str) -> Optional[str]:
+    js = await _request_json("https://api.duckduckgo.com/", params={
         "q": query,
         "format": "json",
         "no_redirect": 1,
@@ -384,8 +828,8 @@ def _ddg_instant_answer(query: str) -> Optional[str]:
 # 8) exchangerate.host
 # 9) TVMaze
 # ----------------------------
-def _hn_search(query: str) -> Optional[str]:
-    js = _request_json("https://hn.algolia.com/api/v1/search", params={"query": query, "hitsPerPage": 1})
+async def _hn_search(query: str) -> Optional[str]:
+    js = await _request_json("https://hn.algolia.com/api/v1/search", params={"query": query, "hitsPerPage": 1})
     if not js or not js.get("hits"):
         return None
     h = js["hits"][0]
@@ -396,17 +840,21 @@ def _hn_search(query: str) -> Optional[str]:
     return f"HN: {title}" + (f" ({url})" if url else "")
 
 
-def _stackexchange_search(query: str) -> Optional[str]:
-    js = _request_json("https://api.stackexchange.com/2.3/search/advanced", params={
+# streamed parsers: stop reading at the end of the first result
+_SE_FIRST_ITEM = functools.partial(JsonFirstItem, "items")
+_CROSSREF_FIRST_ITEM = functools.partial(JsonFirstItem, "message", "items")
+
+
+async def _stackexchange_search(query: str) -> Optional[str]:
+    it = await _request_first("https://api.stackexchange.com/2.3/search/advanced", _SE_FIRST_ITEM, params={
         "order": "desc",
         "sort": "relevance",
         "q": query,
         "site": "stackoverflow",
         "pagesize": 1
     })
-    if not js or not js.get("items"):
+    if not it:
         return None
-    it = js["items"][0]
     title = it.get("title")
     link = it.get("link")
     if not title:
@@ -414,8 +862,8 @@ def _stackexchange_search(query: str) -> Optional[str]:
     return f"StackOverflow: {title}" + (f" ({link})" if link else "")
 
 
-def _github_repo_search(query: str) -> Optional[str]:
-    js = _request_json("https://api.github.com/search/repositories", params={"q": query, "per_page": 1})
+async def _github_repo_search(query: str) -> Optional[str]:
+    js = await _request_json("https://api.github.com/search/repositories", params={"q": query, "per_page": 1})
     if not js or not js.get("items"):
         return None
     it = js["items"][0]
@@ -428,8 +876,8 @@ def _github_repo_search(query: str) -> Optional[str]:
     return f"GitHub: {name} — {desc}".strip(" —")
 
 
-def _openlibrary_search(query: str) -> Optional[str]:
-    js = _request_json("https://openlibrary.org/search.json", params={"q": query, "limit": 1})
+async def _openlibrary_search(query: str) -> Optional[str]:
+    js = await _request_json("https://openlibrary.org/search.json", params={"q": query, "limit": 1})
     if not js or not js.get("docs"):
         return None
     d = js["docs"][0]
@@ -446,14 +894,10 @@ def _openlibrary_search(query: str) -> Optional[str]:
     return "OpenLibrary: " + " ".join(bits)
 
 
-def _crossref_search(query: str) -> Optional[str]:
-    js = _request_json("https://api.crossref.org/works", params={"query": query, "rows": 1})
-    if not js:
-        return None
-    items = js.get("message", {}).get("items", [])
-    if not items:
+async def _crossref_search(query: str) -> Optional[str]:
+    it = await _request_first("https://api.crossref.org/works", _CROSSREF_FIRST_ITEM, params={"query": query, "rows": 1})
+    if not it:
         return None
-    it = items[0]
     title = (it.get("title") or [""])[0]
     doi = it.get("DOI")
     if not title:
@@ -461,76 +905,97 @@ def _crossref_search(query: str) -> Optional[str]:
     return f"Crossref: {title}" + (f" (DOI: {doi})" if doi else "")
 
 
-def _arxiv_search(query: str) -> Optional[str]:
-    # arXiv API returns Atom XML, but we can grab the first <title> after the feed title.
+async def _arxiv_search(query: str) -> Optional[str]:
+    # arXiv API returns Atom XML; parsed as it arrives, up to the first <entry>
     url = "https://export.arxiv.org/api/query"
-    txt = _request_text(url, params={"search_query": f"all:{query}", "start": 0, "max_results": 1})
-    if not txt:
-        return None
-    titles = re.findall(r"<title>(.*?)</title>", txt, flags=re.DOTALL)
-    if len(titles) < 2:
+    entry = await _request_first(
+        url,
+        AtomFirstEntry,
+        params={"search_query": f"all:{query}", "start": 0, "max_results": 1},
+        headers={"Accept": "application/atom+xml"},
+    )
+    if not entry:
         return None
-    paper_title = re.sub(r"\s+", " ", titles[1]).strip()
+    paper_title = entry.get("title")
     if paper_title:
         return f"arXiv: {paper_title}"
     return None
 
 
-def _coingecko_price(query: str) -> Optional[str]:
-    # very simple: if query mentions a coin, try common ones
-    ql = query.lower()
-    coin_map = {
-        "bitcoin": "bitcoin",
-        "btc": "bitcoin",
-        "ethereum": "ethereum",
-        "eth": "ethereum",
-        "solana": "solana",
-        "sol": "solana",
-        "dogecoin": "dogecoin",
-        "doge": "dogecoin",
-    }
-    coin = None
-    for k, v in coin_map.items():
-        if re.search(rf"\b{k}\b", ql):
-            coin = v
-            break
+async def _coin_table() -> Optional[Dict[str, Dict[str, float]]]:
+    """coin id -> {"usd": ..., "eur": ...} for every coin in COINS, one request per TTL."""
+    table = await asyncio.to_thread(_table_get, "coins")
+    if table is not None:
+        return table
+    ids = sorted(set(COINS.values()))
+    js = await _request_json(
+        "https://api.coingecko.com/api/v3/simple/price",
+        params={"ids": ",".join(ids), "vs_currencies": ",".join(COIN_QUOTES)},
+    )
+    if not isinstance(js, dict):
+        return None
+    table = {coin: js[coin] for coin in ids if isinstance(js.get(coin), dict)}
+    if not table:
+        return None
+    await asyncio.to_thread(_table_set, "coins", table, COIN_TABLE_TTL_SECONDS)
+    return table
+
+
+async def _coingecko_price(query: str) -> Optional[str]:
+    # very simple: if query mentions a coin, try common ones (query_canon.COINS)
+    coin = find_coin(query)
     if not coin:
         return None
-    js = _request_json("https://api.coingecko.com/api/v3/simple/price", params={"ids": coin, "vs_currencies": "usd,eur"})
-    if not js or coin not in js:
+    table = await _coin_table()
+    if not table or coin not in table:
         return None
-    usd = js[coin].get("usd")
-    eur = js[coin].get("eur")
+    usd = table[coin].get("usd")
+    eur = table[coin].get("eur")
     return f"{coin.title()} price: ${usd} / €{eur}"
 
 
-def _exchange_rate(query: str) -> Optional[str]:
-    # naive pattern: "usd to eur", "convert 100 usd to eur"
-    ql = query.lower()
-    m = re.search(r"\b([0-9]+(\.[0-9]+)?)\s*([a-z]{3})\s*(to|in)\s*([a-z]{3})\b", ql)
-    amount = 1.0
-    base = None
-    quote = None
-    if m:
-        amount = float(m.group(1))
-        base = m.group(3).upper()
-        quote = m.group(5).upper()
+async def _rate_table(base: str) -> Optional[Dict[str, float]]:
+    """Currency -> units per one base, for every currency the API knows; one request per TTL."""
+    table = await asyncio.to_thread(_table_get, f"rates:{base}")
+    if table is not None:
+        return table
+    js = await _request_json("https://api.exchangerate.host/latest", params={"base": base})
+    if not isinstance(js, dict):
+        return None
+    if isinstance(js.get("rates"), dict):
+        raw = js["rates"]
+    elif isinstance(js.get("quotes"), dict):
+        # newer responses: {"quotes": {"EURUSD": 1.08, ...}}
+        raw = {k[len(base):] if k.startswith(base) else k: v for k, v in js["quotes"].items()}
     else:
-        m2 = re.search(r"\b([a-z]{3})\s*(to|in)\s*([a-z]{3})\b", ql)
-        if not m2:
-            return None
-        base = m2.group(1).upper()
-        quote = m2.group(3).upper()
+        return None
+    table = {str(k).upper(): float(v) for k, v in raw.items() if isinstance(v, (int, float)) and v > 0}
+    if not table:
+        return None
+    table[base] = 1.0
+    await asyncio.to_thread(_table_set, f"rates:{base}", table, RATE_TABLE_TTL_SECONDS)
+    return table
+
+
+async def _exchange_rate(query: str) -> Optional[str]:
+    # naive pattern: "usd to eur", "convert 100 usd to eur"
+    pair = parse_currency(query)
+    if not pair:
+        return None
+    amount, base, quote = pair
 
-    js = _request_json("https://api.exchangerate.host/convert", params={"from": base, "to": quote, "amount": amount})
-    if not js or "result" not in js:
+    # cross rate from the shared pivot table; a currency it lacks gets its own table
+    table = await _rate_table(RATE_TABLE_BASE)
+    if not table or base not in table or quote not in table:
+        table = await _rate_table(base)
+    if not table or base not in table or quote not in table:
         return None
-    result = js["result"]
+    result = amount * table[quote] / table[base]
     return f"{amount:g} {base} ≈ {result:.4g} {quote}"
 
 
-def _tvmaze_search(query: str) -> Optional[str]:
-    js = _request_json("https://api.tvmaze.com/search/shows", params={"q": query})
+async def _tvmaze_search(query: str) -> Optional[str]:
+    js = await _request_json("https://api.tvmaze.com/search/shows", params={"q": query})
     if not js:
         return None
     if isinstance(js, list) and js:
@@ -549,74 +1014,553 @@ def _tvmaze_search(query: str) -> Optional[str]:
     return None
 
 
+# ----------------------------
+# Fan-out over independent providers
+# ----------------------------
+async def _first_answer(fns, q: str) -> Optional[str]:
+    """
+    Run every provider concurrently and return the first non-empty answer.
+    The others are cancelled, including requests already in flight.
+    """
+    tasks = [asyncio.ensure_future(fn(q)) for fn in fns]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                out = await fut
+            except Exception:
+                continue
+            if out:
+                return out
+    finally:
+        for task in tasks:
+            task.cancel()
+    return None
+
+
+# ----------------------------
+# Learned provider order
+# ----------------------------
+_PROVIDERS = {
+    "weather": _answer_weather,
+    "currency": _exchange_rate,
+    "crypto": _coingecko_price,
+    "wiki": _wiki_summary,
+    "ddg": _ddg_instant_answer,
+    "stackexchange": _stackexchange_search,
+    "github": _github_repo_search,
+    "hn": _hn_search,
+    "openlibrary": _openlibrary_search,
+    "crossref": _crossref_search,
+    "arxiv": _arxiv_search,
+    "tvmaze": _tvmaze_search,
+}
+
+# default chain: (stage, providers); a stage with several providers is the fan-out group
+_DEFAULT_PLAN = [
+    ("wiki", ["wiki"]),
+    ("ddg", ["ddg"]),
+    ("tech", ["stackexchange", "github", "hn", "openlibrary", "crossref", "arxiv", "tvmaze"]),
+]
+
+
+def _provider_plan(qclass: str) -> List[Tuple[str, List[str]]]:
+    """
+    The chain for this query class, cheapest expected time-to-answer first,
+    minus providers that (almost) never answer it. Now and then (never under
+    a deadline) the full default chain is used so pruned providers get measured.
+    """
+    try:
+        stats = _get_provider_stats()
+    except Exception:
+        return _DEFAULT_PLAN
+    if _deadline_var.get() is None and random.random() < PROVIDER_EXPLORE_RATE:
+        return _DEFAULT_PLAN
+
+    def useful(name: str) -> bool:
+        return (
+            stats.samples(qclass, name) < PROVIDER_PRUNE_MIN_SAMPLES
+            or stats.hit_rate(qclass, name) >= PROVIDER_PRUNE_HIT_RATE
+        )
+
+    plan = []
+    for stage, members in _DEFAULT_PLAN:
+        members = [m for m in members if useful(m)]
+        if members:
+            plan.append((stage, stats.order(qclass, members)))
+    if not plan:
+        return _DEFAULT_PLAN
+    plan.sort(key=lambda st: stats.expected_cost(qclass, st[0]))
+    return plan
+
+
+async def _aprovider_stats() -> ProviderStats:
+    # the first open reads the whole table: do it off the loop
+    if _provider_stats is not None:
+        return _provider_stats
+    return await asyncio.to_thread(_get_provider_stats)
+
+
+def _record_outcome(qclass: str, name: str, hit: bool, latency: float) -> None:
+    try:
+        stats = _get_provider_stats()
+        if stats.record(qclass, name, hit, latency):
+            asyncio.get_running_loop().run_in_executor(None, stats.flush)
+    except Exception:
+        pass
+
+
+async def _timed_provider(qclass: str, name: str, q: str, members: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Run one provider (or, with members, the fan-out group) and record hit/miss
+    and latency under name. Calls cut short by a skipped request are not counted.
+    """
+    box = [0]
+    token = _skipped_var.set(_skipped_var.get() + (box,))
+    start = time.monotonic()
+    try:
+        if members is None:
+            ans = await _PROVIDERS[name](q)
+        elif FALLBACK_FANOUT:
+            ans = await _first_answer([functools.partial(_timed_provider, qclass, m) for m in members], q)
+        else:
+            ans = None
+            for m in members:
+                ans = await _timed_provider(qclass, m, q)
+                if ans:
+                    break
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        ans = None
+    finally:
+        _skipped_var.reset(token)
+    if ans or not box[0]:
+        _record_outcome(qclass, name, bool(ans), time.monotonic() - start)
+    return ans
+
+
+async def _flush_provider_stats() -> None:
+    if _provider_stats is not None:
+        await asyncio.to_thread(_provider_stats.flush)
+
+
 # ----------------------------
 # Main entry
 # ----------------------------
-def search_and_summarise(query: str) -> str:
-    # 0) 1-hour cache
-    cached = _cache_get(query)
-    if cached:
-        return cached
+on_shutdown(aclose)
+on_shutdown(_flush_provider_stats)
+
 
+def search_and_summarise(query: str, deadline: Optional[float] = None) -> str:
+    """Blocking entry point; runs asearch_and_summarise on the shared background loop."""
+    return run_sync(asearch_and_summarise(query, deadline))
+
+
+async def asearch_and_summarise(query: str, deadline: Optional[float] = None) -> str:
+    """
+    Answer a question from the cache or the provider chain.
+    deadline: latency budget in seconds (e.g. 2.0 for voice). Providers and
+    requests that cannot finish in what is left are skipped; if nothing is
+    found in time, DEADLINE_MESSAGE is returned and the search goes on in the
+    background so asking again hits the cache.
+    """
     q = query.strip()
     if not q:
         return "Ask me something."
 
+    await _record_query(q)
+
+    # 0) cache (memory, then disk); a stale hit is answered now and refreshed behind
+    entry = await _acache_lookup(query)
+    if entry:
+        if not entry.is_fresh():
+            _schedule_refresh(query)
+        if not entry.negative:
+            _remember(q, [entry.answer])
+        return entry.answer
+
+    if deadline is None:
+        ans = await _resolve(q)
+    else:
+        ans = await _resolve_within(q, float(deadline))
+    if ans is None:
+        # out of time, breakers open or retries given up: that says nothing about
+        # the question, so no negative entry; keep looking in the background
+        _schedule_refresh(query)
+        return DEADLINE_MESSAGE if deadline is not None else UNREACHABLE_MESSAGE
+    if ans:
+        _remember(q, [ans])
+        return ans
+
+    # Final fallback (the negative entry is stored by _resolve, under its lease)
+    return NO_ANSWER_MESSAGE
+
+
+def prefetch(query: str, fresh_for: float = 0.0) -> bool:
+    """Blocking wrapper around aprefetch()."""
+    return run_sync(aprefetch(query, fresh_for))
+
+
+async def aprefetch(query: str, fresh_for: float = 0.0) -> bool:
+    """
+    Fetch and cache an answer ahead of time unless the cached one is still
+    fresh fresh_for seconds from now. Runs at background priority: requests
+    that would wait more than BACKGROUND_MAX_WAIT for a slot are skipped.
+    Returns True if a new answer was stored.
+    """
+    q = query.strip()
+    if not q:
+        return False
+    entry = await _acache_lookup(query)
+    if entry and entry.expires - time.time() > fresh_for:
+        return False
+
+    token = _max_wait_var.set(BACKGROUND_MAX_WAIT)
+    try:
+        ans = await _resolve(q)
+    finally:
+        _max_wait_var.reset(token)
+    return bool(ans)
+
+
+# cache key -> running refresh task (one refresh per query at a time)
+_refreshing: Dict[str, "asyncio.Task"] = {}
+
+
+def _schedule_refresh(query: str) -> None:
+    key = _cache_key(query)
+    if key in _refreshing:
+        return
+    task = asyncio.get_running_loop().create_task(_refresh(query))
+    _refreshing[key] = task
+    task.add_done_callback(lambda _t: _refreshing.pop(key, None))
+
+
+async def _refresh(query: str) -> None:
+    # runs in its own task context: not bound by the caller's deadline
+    _deadline_var.set(None)
+    # a failed refresh keeps serving the stale answer until its window ends
+    try:
+        await _resolve(query.strip())
+    except Exception:
+        return
+
+
+async def _resolve_within(q: str, budget: float) -> Optional[str]:
+    """_resolve() under a deadline; running out of time is no verdict (None)."""
+    token = _deadline_var.set(time.monotonic() + max(0.0, budget))
+    try:
+        # providers respect the budget themselves; the timeout is only a safety net
+        return await asyncio.wait_for(_resolve(q), timeout=max(0.0, budget) + DEADLINE_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        _deadline_var.reset(token)
+
+
+async def _resolve(q: str) -> Optional[str]:
+    """
+    Find and cache an answer for q. Concurrent callers share one fetch:
+    in this process through single-flight, across processes through a
+    lease in the cache file (the others wait for the answer to land there).
+    Returns the answer, _NOT_FOUND (a negative entry was stored, shared by
+    every waiting caller) or None (requests were skipped: no verdict, nothing
+    stored, and a waiting caller fetches again).
+    """
+    key = _cache_key(q)
+    return await _flights.do("query:" + key, lambda: _resolve_leased(q, key), accept=lambda ans: ans is not None)
+
+
+async def _resolve_leased(q: str, key: str) -> Optional[str]:
+    # every disk / lease call runs in a worker thread: a busy WAL (up to the
+    # 5 s busy timeout) must not stall the other provider tasks on the loop
+    try:
+        disk = (await _astore()).disk
+        leased = await asyncio.to_thread(disk.acquire_lease, key, _LEASE_OWNER, LEASE_SECONDS)
+    except Exception:
+        disk, leased = None, True
+
+    if not leased:
+        entry = await _wait_for_other_process(q, key, disk)
+        if entry is not None:
+            # the lease holder already stored its verdict, negative or not
+            return _NOT_FOUND if entry.negative else entry.answer
+
+    box = [0]
+    token = _skipped_var.set(_skipped_var.get() + (box,))
+    try:
+        try:
+            ans, intent = await _find_answer(q)
+        finally:
+            _skipped_var.reset(token)
+        if ans:
+            await asyncio.to_thread(_cache_set, q, ans, intent)
+            return ans
+        if box[0]:
+            return None
+        # stored before the lease is released, so a process waiting on it finds the miss
+        await asyncio.to_thread(_cache_set_negative, q, NO_ANSWER_MESSAGE)
+        return _NOT_FOUND
+    finally:
+        if disk is not None:
+            try:
+                await asyncio.to_thread(disk.release_lease, key, _LEASE_OWNER)
+            except Exception:
+                pass
+
+
+async def _wait_for_other_process(q: str, key: str, disk: AnswerCache) -> Optional[CacheEntry]:
+    """Poll the shared store until the lease holder's fresh answer appears (or the lease ends)."""
+    until = time.monotonic() + LEASE_SECONDS
+    remaining = _remaining()
+    if remaining is not None:
+        until = min(until, time.monotonic() + remaining)
+    while time.monotonic() < until:
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+        entry = await _acache_lookup(q)
+        if entry is not None and entry.is_fresh():
+            return entry
+        try:
+            if not await asyncio.to_thread(disk.lease_held, key):
+                break
+        except Exception:
+            break
+    entry = await _acache_lookup(q)
+    return entry if entry is not None and entry.is_fresh() else None
+
+
+async def _find_answer(q: str) -> Tuple[Optional[str], Optional[str]]:
+    """Walk the provider chain; returns (answer, intent) or (None, None)."""
     # 1) Weather (API-first)
     if _is_weather_query(q):
-        ans = _answer_weather(q)
+        ans = await _answer_weather(q)
         if ans:
-            _cache_set(query, ans)
-            return ans
+            return ans, "weather"
 
     # 2) Currency
     if _is_currency_query(q):
-        ans = _exchange_rate(q)
+        ans = await _exchange_rate(q)
         if ans:
-            _cache_set(query, ans)
-            return ans
+            return ans, "currency"
 
     # 3) Crypto
     if _is_crypto_query(q):
-        ans = _coingecko_price(q)
+        ans = await _coingecko_price(q)
         if ans:
-            _cache_set(query, ans)
-            return ans
+            return ans, "crypto"
 
-    # 4) Wikipedia for general knowledge (best default)
-    ans = _wiki_summary(q)
-    if ans:
-        _cache_set(query, ans)
-        return ans
+    # 4) general providers in the learned order: Wikipedia, DuckDuckGo Instant
+    # Answer, then the "special" tech/news sources (still no keys)
+    qclass = query_class(q)
+    try:
+        await _aprovider_stats()
+    except Exception:
+        pass
+    for stage, members in _provider_plan(qclass):
+        remaining = _remaining()
+        if remaining is not None and remaining <= 0:
+            _note_skip()
+            break
+        if len(members) == 1:
+            ans = await _timed_provider(qclass, members[0], q)
+        else:
+            ans = await _timed_provider(qclass, stage, q, members)
+        if ans:
+            return ans, stage
+
+    return None, None
+
+
+# ----------------------------
+# Ranked candidates and follow-ups
+# ----------------------------
+# provider -> cache intent of its answers (TTL / stale window)
+_SOURCE_INTENT = {
+    "weather": "weather",
+    "currency": "currency",
+    "crypto": "crypto",
+    "wiki": "wiki",
+    "ddg": "ddg",
+}
+# how much a provider's answer is trusted before looking at its text
+_SOURCE_PRIOR = {
+    "weather": 1.0,
+    "currency": 1.0,
+    "crypto": 1.0,
+    "wiki": 0.8,
+    "stackexchange": 0.7,
+    "ddg": 0.6,
+}
+DEFAULT_SOURCE_PRIOR = 0.5
+
+
+@dataclass
+class Candidate:
+    source: str       # provider name ("wiki", "ddg", "stackexchange", ...)
+    answer: str
+    latency: float    # seconds the provider took
+    score: float      # 0..1, higher is better
+
+
+def _score(q: str, qclass: str, source: str, answer: str) -> float:
+    """Half relevance (topic words found in the answer), the rest provider prior and hit rate."""
+    words = topic_of(q).split()
+    text = answer.lower()
+    relevance = sum(1 for w in words if w in text) / len(words) if words else 0.0
+    try:
+        hit_rate = _get_provider_stats().hit_rate(qclass, source)
+    except Exception:
+        hit_rate = 0.5
+    prior = _SOURCE_PRIOR.get(source, DEFAULT_SOURCE_PRIOR)
+    return round(0.5 * relevance + 0.3 * prior + 0.2 * hit_rate, 3)
+
+
+def _eligible_providers(q: str, qclass: str) -> List[str]:
+    canon = canonical_query(_normalize_query(q))
+    names = [canon.intent] if canon.intent in _SOURCE_INTENT and canon.intent in _PROVIDERS else []
+    for _stage, members in _provider_plan(qclass):
+        names.extend(members)
+    return names
+
+
+async def _candidate(qclass: str, name: str, q: str) -> Optional[Candidate]:
+    start = time.monotonic()
+    ans = await _timed_provider(qclass, name, q)
+    if not ans:
+        return None
+    latency = round(time.monotonic() - start, 3)
+    return Candidate(name, ans, latency, _score(q, qclass, name, ans))
+
+
+async def _fan_out(q: str, timeout: Optional[float] = None) -> Tuple[List[Candidate], bool]:
+    """All eligible providers at once (each still queues for its rate-limit slot); (ranked, complete)."""
+    qclass = query_class(q)
+    try:
+        await _aprovider_stats()
+    except Exception:
+        pass
+    tasks = [asyncio.ensure_future(_candidate(qclass, name, q)) for name in _eligible_providers(q, qclass)]
+    if not tasks:
+        return [], True
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    found = [t.result() for t in done if not t.cancelled() and t.exception() is None and t.result()]
+    found.sort(key=lambda c: (-c.score, c.latency))
+    return found, not pending
+
+
+def _multi_key(q: str) -> str:
+    return "multi:" + _cache_key(q)
+
+
+def _multi_get(q: str) -> Optional[List[Candidate]]:
+    try:
+        entry = _get_store().lookup(_multi_key(q), allow_stale=False)
+        if entry is None or entry.negative:
+            return None
+        return [Candidate(**c) for c in json.loads(entry.answer)]
+    except Exception:
+        return None
+
+
+def _multi_set(q: str, candidates: List[Candidate]) -> None:
+    # the set lives as long as its shortest-lived answer; the best one also becomes the plain answer
+    intents = [_SOURCE_INTENT.get(c.source, "tech") for c in candidates]
+    ttl = min(INTENT_TTL_SECONDS.get(i, CACHE_TTL_SECONDS) for i in intents)
+    try:
+        _get_store().set(_multi_key(q), json.dumps([asdict(c) for c in candidates]), ttl)
+    except Exception:
+        return
+    _cache_set(q, candidates[0].answer, intents[0])
+
+
+def search_multi(query: str, k: int = MULTI_K, deadline: Optional[float] = None) -> List[Candidate]:
+    """Blocking wrapper around asearch_multi()."""
+    return run_sync(asearch_multi(query, k, deadline))
+
+
+async def asearch_multi(query: str, k: int = MULTI_K, deadline: Optional[float] = None) -> List[Candidate]:
+    """
+    Ask every eligible provider in parallel and return the k best answers,
+    ranked by score. The full ranked set is cached, so asking again (or a
+    follow-up) costs no requests. With a deadline, providers still running
+    when it expires are dropped and the partial set is not cached.
+    """
+    q = query.strip()
+    if not q:
+        return []
+    candidates = await _ranked(q, deadline)
+    if candidates:
+        _remember(q, [candidates[0].answer])
+    return candidates[:max(0, int(k))]
 
-    # 5) DuckDuckGo Instant Answer (no key)
-    ans = _ddg_instant_answer(q)
-    if ans:
-        _cache_set(query, ans)
-        return ans
 
-    # 6) “special” tech/news sources (still no keys)
-    # These return useful "top result" style answers without scraping.
-    candidates = [
-        _stackexchange_search,
-        _github_repo_search,
-        _hn_search,
-        _openlibrary_search,
-        _crossref_search,
-        _arxiv_search,
-        _tvmaze_search,
-    ]
-
-    for fn in candidates:
+async def _ranked(q: str, deadline: Optional[float]) -> List[Candidate]:
+    candidates = await asyncio.to_thread(_multi_get, q)
+    if candidates is None:
+        candidates = await _flights.do("multi:" + _cache_key(q), lambda: _resolve_multi(q, deadline))
+    return candidates
+
+
+async def _resolve_multi(q: str, deadline: Optional[float]) -> List[Candidate]:
+    if deadline is None:
+        candidates, complete = await _fan_out(q)
+    else:
+        token = _deadline_var.set(time.monotonic() + max(0.0, float(deadline)))
         try:
-            out = fn(q)
-            if out:
-                _cache_set(query, out)
-                return out
-        except Exception:
-            continue
+            candidates, complete = await _fan_out(q, timeout=max(0.0, float(deadline)) + DEADLINE_GRACE_SECONDS)
+        finally:
+            _deadline_var.reset(token)
+    if candidates and complete:
+        await asyncio.to_thread(_multi_set, q, candidates)
+    return candidates
+
+
+# last answered question, for "tell me more" / "what else"
+_thread: Dict[str, Any] = {}
+
 
-    # Final fallback
-    msg = "I couldn't find a solid answer via free APIs. Try rephrasing the question."
-    _cache_set(query, msg)
-    return msg
+def _remember(q: str, answers: List[str]) -> None:
+    if _thread.get("query") != q:
+        _thread.clear()
+        _thread.update(query=q, given=set())
+    _thread["given"].update(answers)
+    _thread["at"] = time.monotonic()
+
+
+def is_follow_up(text: str) -> bool:
+    """'tell me more', 'what else?': a follow-up phrase and no new topic of its own."""
+    lower = (text or "").lower()
+    if "followup" not in route_intents(lower):
+        return False
+    for phrase in INTENT_KEYWORDS["followup"]:
+        lower = lower.replace(phrase, " ")
+    return all(w in _FOLLOWUP_REST for w in topic_of(lower).split())
+
+
+_FOLLOWUP_REST = frozenset(("that", "it", "this", "them", "there", "more", "else", "so", "ok", "okay", "and"))
+
+
+def follow_up(text: str, deadline: Optional[float] = None) -> Optional[str]:
+    """Blocking wrapper around afollow_up()."""
+    return run_sync(afollow_up(text, deadline))
+
+
+async def afollow_up(text: str, deadline: Optional[float] = None) -> Optional[str]:
+    """
+    Next-best answer to the last question when text is a follow-up, else None
+    (also when there is no recent question). The first follow-up runs the
+    search_multi fan-out for that question once; later ones read its cached set.
+    """
+    if not is_follow_up(text):
+        return None
+    query = _thread.get("query")
+    if not query or time.monotonic() - _thread.get("at", 0.0) > FOLLOWUP_WINDOW_SECONDS:
+        return None
+    for c in await _ranked(query, deadline):
+        if c.answer not in _thread["given"]:
+            _remember(query, [c.answer])
+            return c.answer
+    _remember(query, [])
+    return FOLLOWUP_EXHAUSTED_MESSAGE
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(BASE_DIR)
+
+from utils.intent_router import KEYWORDS, ROUTER
+
+LOG_DIRS = [Path(BASE_DIR) / "logs" / "conversations", Path(BASE_DIR) / "data" / "conversations"]
+
+
+def load_utterances():
+    texts = []
+    for folder in LOG_DIRS:
+        for path in sorted(folder.glob("*.jsonl")):
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        text = (json.loads(line).get("text") or "").strip()
+                    except (ValueError, AttributeError):
+                        continue
+                    if text.startswith("You:"):
+                        text = text[4:].strip()
+                    if text:
+                        texts.append(text)
+    return texts
+
+
+def substring_scan(text):
+    # what the call sites did before: lowercase, then one `k in lower` per keyword per label
+    lower = text.lower()
+    return frozenset(label for label, words in KEYWORDS.items() if any(w in lower for w in words))
+
+
+def timed(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent router throughput on the logged utterances")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = load_utterances()
+    if not texts:
+        print("[Bench] No logged utterances found in logs/conversations.")
+        return
+
+    mismatches = [t for t in texts if ROUTER.route(t) != substring_scan(t)]
+    if mismatches:
+        print(f"[Bench] {len(mismatches)} utterances routed differently, e.g. {mismatches[0]!r}")
+
+    n = len(texts) * args.rounds
+    base = timed(substring_scan, texts, args.rounds)
+    fast = timed(ROUTER.route, texts, args.rounds)
+    print(f"[Bench] {len(texts)} utterances x {args.rounds} rounds, {len(ROUTER.keywords)} keywords")
+    print(f"[Bench] substring scans : {n / base:,.0f} utterances/s")
+    print(f"[Bench] intent router   : {n / fast:,.0f} utterances/s ({base / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(BASE_DIR)
+
+from online import http_pool, web_search
+from online.replay import Cassette, Recorder, ReplayServer
+
+DEFAULT_CASSETTE = os.path.join(BASE_DIR, "data", "replay", "web_search.jsonl")
+
+# one or more queries per provider path in web_search._find_answer
+DEFAULT_CORPUS = [
+    "weather in Bucharest",
+    "weather tomorrow in Cluj Napoca",
+    "what is the temperature in London",
+    "convert 100 eur to usd",
+    "usd to ron exchange rate",
+    "bitcoin price",
+    "ethereum price",
+    "who was Ada Lovelace",
+    "Raspberry Pi",
+    "Apollo program",
+    "python asyncio gather timeout",
+    "rust borrow checker lifetime error",
+    "attention is all you need",
+    "the hobbit book",
+    "breaking bad tv show",
+    "weather in Bucharest",
+    "bitcoin price",
+    # rephrasings: same cache entry as an earlier question
+    "whats the weather in bucharest tomorrow",
+    "tomorrow weather Bucharest",
+    "BTC price",
+    "tell me about Ada Lovelace",
+    "what is the Apollo program?",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def load_corpus(path):
+    if not path:
+        return list(DEFAULT_CORPUS)
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def isolate_caches(workdir):
+    # every run starts cold and never touches the real ~/.ares_* files
+    web_search.CACHE_PATH = os.path.join(workdir, "web_cache.sqlite3")
+    web_search.GEOCODE_INDEX_PATH = os.path.join(workdir, "geocode.sqlite3")
+    web_search.PROVIDER_STATS_PATH = os.path.join(workdir, "provider_stats.sqlite3")
+    web_search._store = None
+    web_search._geo_index = None
+    web_search._provider_stats = None
+    web_search._fuzzy = None
+    # a local abstracts index would answer wiki questions with no upstream call at all
+    web_search._offline_wiki.index_path = os.path.join(workdir, "no_wiki_index.sqlite3")
+
+
+def cache_counts():
+    stats = web_search.cache_stats()
+    mem = stats.get("memory", {})
+    disk = stats.get("disk", {})
+    return mem.get("hits", 0) + disk.get("hits", 0), mem.get("hits", 0) + mem.get("misses", 0)
+
+
+def run_pass(corpus, calls_so_far):
+    latencies, calls = [], []
+    hits0, lookups0 = cache_counts()
+    for query in corpus:
+        before = calls_so_far()
+        start = time.perf_counter()
+        web_search.search_and_summarise(query)
+        latencies.append(time.perf_counter() - start)
+        calls.append(calls_so_far() - before)
+    hits1, lookups1 = cache_counts()
+    lookups = lookups1 - lookups0
+    return {
+        "queries": len(corpus),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies),
+        "calls_per_query": sum(calls) / len(calls),
+        "zero_call_share": sum(1 for c in calls if c == 0) / len(calls),
+        "cache_hit_rate": (hits1 - hits0) / lookups if lookups else 0.0,
+    }
+
+
+def report(label, r):
+    print(
+        f"[Bench] {label:<8} n={r['queries']:<4} "
+        f"p50={r['p50'] * 1000:.0f}ms p95={r['p95'] * 1000:.0f}ms max={r['max'] * 1000:.0f}ms "
+        f"upstream/query={r['calls_per_query']:.2f} "
+        f"no-upstream={r['zero_call_share']:.0%} "
+        f"cache-hit={r['cache_hit_rate']:.0%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_and_summarise benchmark on recorded provider responses")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--corpus", help="file with one query per line (default: built-in corpus)")
+    parser.add_argument("--record", action="store_true", help="hit the real providers and (re)fill the cassette")
+    parser.add_argument("--passes", type=int, default=2, help="pass 1 runs cold, the rest see the cache")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    cassette = Cassette(args.cassette)
+
+    with tempfile.TemporaryDirectory(prefix="ares-bench-") as workdir:
+        isolate_caches(workdir)
+
+        if args.record:
+            recorder = Recorder(cassette)
+            http_pool.set_transport(recorder)
+            try:
+                report("record", run_pass(corpus, lambda: recorder.calls))
+            finally:
+                http_pool.set_transport(None)
+            print(f"[Bench] cassette {args.cassette}: {len(cassette)} responses")
+            return
+
+        if not len(cassette):
+            print(f"[Bench] Empty cassette {args.cassette}; record one first with --record")
+            return
+
+        server = ReplayServer(
+            cassette,
+            latency=args.latency_ms / 1000.0,
+            jitter=args.jitter_ms / 1000.0,
+            error_rate=args.error_rate,
+            rate_429=args.rate_429,
+            seed=args.seed,
+        )
+        with server:
+            http_pool.set_transport(server.transport())
+            try:
+                for n in range(1, args.passes + 1):
+                    report(f"pass {n}", run_pass(corpus, lambda: server.requests))
+            finally:
+                http_pool.set_transport(None)
+
+        print(
+            f"[Bench] stand-in: {server.requests} requests, {server.misses} unrecorded, "
+            f"{server.errors} injected 503, {server.throttled} injected 429"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(BASE_DIR)
+
+from network.providers.wikipedia_offline import DEFAULT_INDEX_PATH, OfflineWikipediaProvider
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(name, samples):
+    total = sum(samples)
+    print(
+        f"[Bench] {name:<8} n={len(samples):<6} "
+        f"p50={percentile(samples, 50) * 1000:.3f}ms "
+        f"p95={percentile(samples, 95) * 1000:.3f}ms "
+        f"max={max(samples) * 1000:.3f}ms "
+        f"({len(samples) / total:.0f} ops/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookup benchmark for the offline Wikipedia index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("-n", type=int, default=2000, help="lookups per kind")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    wiki = OfflineWikipediaProvider(args.index)
+    if not wiki.available():
+        print(f"[Bench] No index at {args.index}; build one with:")
+        print("  python -m network.providers.wikipedia_offline build enwiki-latest-abstract.xml.gz")
+        return
+
+    # sample real titles so summary() hits, and use their words as search queries
+    db = wiki._db()
+    total = db.execute("SELECT MAX(id) FROM pages").fetchone()[0] or 0
+    rng = random.Random(args.seed)
+    titles = []
+    while total and len(titles) < args.n:
+        row = db.execute("SELECT title FROM pages WHERE id = ?", (rng.randint(1, total),)).fetchone()
+        if row:
+            titles.append(row[0])
+    if not titles:
+        print("[Bench] Index is empty.")
+        return
+
+    summary_times, search_times = [], []
+    for title in titles:
+        start = time.perf_counter()
+        wiki.summary(title)
+        summary_times.append(time.perf_counter() - start)
+
+    for title in titles:
+        start = time.perf_counter()
+        wiki.search(title, limit=5)
+        search_times.append(time.perf_counter() - start)
+
+    print(f"[Bench] index={args.index} pages~{total} size={os.path.getsize(args.index) / 1e6:.1f}MB")
+    report("summary", summary_times)
+    report("search", search_times)
+
+
+if __name__ == "__main__":
+    main()
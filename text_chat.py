@@ -1,39 +1,26 @@
 from audio.mic_listener import handle_intent
+from core.auto_online import start_auto_online
 from speech.emotional_voice import speak
-from online.web_search import search_and_summarise
+from online.web_search import follow_up, search_and_summarise
+from utils.intent_router import route
 
 
 def _looks_like_web_question(lower: str) -> bool:
     """
     Decide if this text should go to web search.
-    We allow some common typos (wheather, wheater) and generic words.
+    The keyword table (common typos like 'wheather' included) is the "web"
+    label in utils/intent_router.py (the voice loop uses the narrower "voice_web").
     """
-    web_keywords = [
-        "score",
-        "result",
-        "search",
-        "stock",
-        "price",
-        "forecast",
-        "temperature",
-        "rain",
-        "sunny",
-    ]
-
-    if any(w in lower for w in web_keywords):
-        return True
-
-    # Handle common 'weather' typos
-    if "weather" in lower or "wheather" in lower or "wheater" in lower:
-        return True
-
-    return False
+    return "web" in route(lower)
 
 
 def main():
     print("ARES text chat. Type 'hello ares' to start talking.")
     print("Type 'goodbye' or 'exit' to finish.\n")
 
+    # refresh the questions asked every day shortly before they are usually asked
+    start_auto_online()
+
     active = False
 
     while True:
@@ -58,6 +45,13 @@ def main():
             print("ARES is sleeping. Say 'hello ares' to wake him.")
             continue
 
+        # "tell me more" / "what else" about the last web answer
+        more = follow_up(lower)
+        if more:
+            print(f"ARES: {more}")
+            speak(more)
+            continue
+
         # Web vs local intent
         if _looks_like_web_question(lower):
             print(f"[TEXT] Processing web question: '{lower}'")
@@ -0,0 +1,134 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set
+
+# ============================================================
+# ARES intent / topic router
+# - One declarative table: label -> keywords (substring match on the
+#   lowercased text, same semantics as the old `k in lower` checks).
+# - Compiled once into a single regex; one scan of the text returns
+#   every label hit, for every caller (chat, voice, web search,
+#   daily summarizer).
+# - Labels: search intents ("weather", "currency", ...), "web" and
+#   "voice_web" for "send this to web search" (chat / voice),
+#   "topic.*" / "mood.*" for summaries, and a few small-talk ones.
+# ============================================================
+
+KEYWORDS: Dict[str, tuple] = {
+    # online/web_search provider intents
+    "weather": (
+        "weather", "temperature", "forecast", "meteo", "how hot", "how cold",
+        "rain", "sunny", "snow",
+    ),
+    "score": ("score", "result", "last match", "final score", "vs", "match recap"),
+    "currency": ("exchange rate", "convert", "usd to", "eur to", "gbp to", "ron to"),
+    "crypto": ("btc", "bitcoin", "eth", "ethereum", "solana", "doge", "crypto price"),
+
+    # text chat: goes to web search instead of the local intent engine
+    "web": (
+        "score", "result", "search", "stock", "price", "forecast", "temperature",
+        "rain", "sunny", "weather", "wheather", "wheater",
+    ),
+    # voice: the same, narrower, since speech is free-form ("training" holds "rain")
+    "voice_web": ("score", "result", "search", "weather", "stock"),
+
+    # small talk
+    "greeting": ("hello", "hi ares"),
+    "goodbye": ("goodbye", "bye"),
+    "how_are_you": ("how are you",),
+    "thanks": ("thank",),
+    # follow-up to the last web answer (online/web_search.is_follow_up)
+    "followup": ("tell me more", "what else", "anything else", "something else", "more about that"),
+    "important": ("i felt", "i feel", "i think", "important"),
+
+    # daily summary topics and moods
+    "topic.weather": ("weather",),
+    "topic.stock": ("stock",),
+    "topic.training": ("training",),
+    "topic.health": ("health",),
+    "topic.rheinmetall": ("rheinmetall",),
+    "topic.work": ("work",),
+    "mood.tired": ("tired",),
+    "mood.good": ("good",),
+    "mood.bad": ("bad",),
+    "mood.angry": ("angry",),
+    "mood.happy": ("happy",),
+    "mood.sad": ("sad",),
+    "mood.stressed": ("stressed",),
+    "mood.worried": ("worried",),
+}
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex for a set of literals shaped like a trie ("eth(?:ereum)?"), so each
+    position costs one walk down shared prefixes instead of one try per
+    keyword. Optional tails are greedy: the longest keyword wins.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class IntentRouter:
+    """
+    Single-pass keyword matcher. route(text) -> every label with at least one
+    keyword occurring in text.lower().
+
+    The pattern is a lookahead over a trie of all keywords, tried at each
+    position: overlapping hits ("bye" inside "goodbye") are all found, and a
+    match at a position also counts every shorter keyword that is a prefix of
+    it ("eth" when "ethereum" matched).
+    """
+
+    def __init__(self, table: Mapping[str, Iterable[str]]):
+        by_keyword: Dict[str, Set[str]] = {}
+        for label, words in table.items():
+            for word in words:
+                word = word.lower()
+                if word:
+                    by_keyword.setdefault(word, set()).add(label)
+
+        self.keywords = sorted(by_keyword, key=len, reverse=True)
+        self._labels: Dict[str, FrozenSet[str]] = {}
+        for word in self.keywords:
+            labels: Set[str] = set()
+            for other, other_labels in by_keyword.items():
+                if word.startswith(other):
+                    labels |= other_labels
+            self._labels[word] = frozenset(labels)
+
+        self._pattern = re.compile(f"(?=({_trie_pattern(self.keywords)}))")
+
+    def route(self, text: str) -> FrozenSet[str]:
+        hits: Set[str] = set()
+        labels = self._labels
+        for word in set(self._pattern.findall((text or "").lower())):
+            hits |= labels[word]
+        return frozenset(hits)
+
+    def keywords_in(self, text: str) -> List[str]:
+        """Every table keyword occurring in text (for debugging the table)."""
+        found = set(self._pattern.findall((text or "").lower()))
+        return sorted(k for k in self.keywords if any(w.startswith(k) for w in found))
+
+
+ROUTER = IntentRouter(KEYWORDS)
+
+
+@lru_cache(maxsize=1024)
+def route(text: str) -> FrozenSet[str]:
+    """Labels for text with the shared table; repeated checks of one utterance scan it once."""
+    return ROUTER.route(text)